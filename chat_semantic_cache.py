@@ -0,0 +1,76 @@
+import time
+
+from sentence_transformers import SentenceTransformer
+
+from openai_client import get_api_host, get_client
+
+# Client construction (including .env loading and Azure credential discovery)
+# happens once in the shared module, not per script.
+client, MODEL_NAME = get_client()
+API_HOST = get_api_host()
+
+# Local embedding model, loaded once per process. Embedding a short question
+# takes a few milliseconds on CPU — cheap enough to run on every turn when a
+# hit saves an entire model round trip.
+encoder = SentenceTransformer("all-MiniLM-L6-v2")
+
+# A paraphrase of an earlier question ("what's the weather in Sydney?" vs
+# "how is it looking in Sydney today?") embeds close to it, so a high cosine
+# similarity lets the cached answer be reused without calling the model.
+SIMILARITY_THRESHOLD = 0.95
+# Answers go stale: pick the TTL for the domain (weather should be short,
+# static facts can live much longer). One conservative value here.
+CACHE_TTL_SECONDS = 5 * 60
+
+# Prior (embedding, answer, expiry) triples, scanned linearly; a real
+# deployment with many entries would hold these in a vector index instead.
+semantic_cache: list[tuple[list[float], str, float]] = []
+
+
+def cosine_similarity(a, b):
+    return sum(x * y for x, y in zip(a, b)) / ((sum(x * x for x in a) ** 0.5) * (sum(y * y for y in b) ** 0.5))
+
+
+def lookup_cached_answer(embedding) -> str | None:
+    """Return the best non-expired cached answer above the similarity bar."""
+    now = time.time()
+    semantic_cache[:] = [entry for entry in semantic_cache if entry[2] > now]
+    best_answer = None
+    best_similarity = SIMILARITY_THRESHOLD
+    for cached_embedding, answer, _ in semantic_cache:
+        similarity = cosine_similarity(embedding, cached_embedding)
+        if similarity >= best_similarity:
+            best_similarity = similarity
+            best_answer = answer
+    return best_answer
+
+
+messages = [
+    {"role": "system", "content": "I am a teaching assistant helping with Python questions for Berkeley CS 61A."},
+]
+
+while True:
+    question = input("\nYour question: ")
+
+    bot_response = None
+    embedding = encoder.encode(question).tolist()
+    if (cached := lookup_cached_answer(embedding)) is not None:
+        # Semantically close enough to an earlier question: the whole
+        # model call is skipped and the stored answer is reused.
+        print("(answered from semantic cache)")
+        bot_response = cached
+    else:
+        print("Sending question...")
+        response = client.chat.completions.create(
+            model=MODEL_NAME,
+            messages=[*messages, {"role": "user", "content": question}],
+            temperature=0.5,
+        )
+        bot_response = response.choices[0].message.content
+        semantic_cache.append((embedding, bot_response, time.time() + CACHE_TTL_SECONDS))
+
+    messages.append({"role": "user", "content": question})
+    messages.append({"role": "assistant", "content": bot_response})
+
+    print("Answer: ")
+    print(bot_response)
@@ -0,0 +1,274 @@
+import asyncio
+import functools
+import os
+
+import orjson
+
+from openai_client import cached_create_async, close_async_client, get_api_host, get_async_client
+
+# Client construction (including .env loading and Azure credential discovery)
+# happens once in the shared module, not per script.
+client, MODEL_NAME = get_async_client()
+API_HOST = get_api_host()
+
+
+# One tools list shared across every request in the batch.
+tools = (
+    {
+        "type": "function",
+        "function": {
+            "name": "lookup_weather",
+            "description": "Lookup the weather for a given city name or zip code.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "city_name": {
+                        "type": "string",
+                        "description": "The city name",
+                    },
+                    "zip_code": {
+                        "type": "string",
+                        "description": "The zip code",
+                    },
+                },
+                "additionalProperties": False,
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "lookup_movies",
+            "description": "Lookup movies playing in a given city name or zip code.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "city_name": {
+                        "type": "string",
+                        "description": "The city name",
+                    },
+                    "zip_code": {
+                        "type": "string",
+                        "description": "The zip code",
+                    },
+                },
+                "additionalProperties": False,
+            },
+        },
+    },
+)
+
+
+# ---------------------------------------------------------------------------
+# Tool (function) implementations
+# ---------------------------------------------------------------------------
+@functools.lru_cache(maxsize=256)
+def lookup_weather(city_name: str | None = None, zip_code: str | None = None) -> dict:
+    """Looks up the weather for given city_name and zip_code."""
+    location = city_name or zip_code or "unknown"
+    # In a real implementation, call an external weather API here.
+    return {
+        "location": location,
+        "condition": "rain showers",
+        "rain_mm_last_24h": 7,
+        "recommendation": "Good day for indoor activities if you dislike drizzle.",
+    }
+
+
+@functools.lru_cache(maxsize=256)
+def lookup_movies(city_name: str | None = None, zip_code: str | None = None) -> dict:
+    """Returns a list of movies playing in the given location."""
+    location = city_name or zip_code or "unknown"
+    # A real implementation could query a cinema listings API.
+    return {
+        "location": location,
+        "movies": [
+            {"title": "The Quantum Reef", "rating": "PG-13"},
+            {"title": "Storm Over Harbour Bay", "rating": "PG"},
+            {"title": "Midnight Koala", "rating": "R"},
+        ],
+    }
+
+
+available_functions = {
+    "lookup_weather": lookup_weather,
+    "lookup_movies": lookup_movies,
+}
+
+# Independent questions, answered concurrently. For eval-style workloads the
+# per-request round trips dominate, so fanning out with a bounded semaphore
+# gives near-linear throughput gains over answering one at a time.
+questions = [
+    "Is it rainy enough in Sydney to watch movies and which ones are on?",
+    "What's the weather like in 94705?",
+    "Which movies are playing in Berkeley right now?",
+    "Should I pack an umbrella for my trip to Singapore?",
+]
+
+semaphore = asyncio.Semaphore(int(os.getenv("MAX_CONCURRENT_REQUESTS", "16")))
+
+# Opt into the offline Batch API instead of parallel live calls. Batched
+# requests run asynchronously server-side at half price, which suits
+# non-latency-critical workloads like this eval set; interactive flows should
+# keep the concurrent path. Only hosts exposing /v1/batches (OpenAI.com and
+# batch-enabled Azure deployments) support it.
+USE_BATCH_API = os.getenv("USE_BATCH_API") is not None
+BATCH_POLL_SECONDS = 30
+
+
+async def run_tool(tool_call):
+    """Execute one requested tool and build its tool-role message."""
+    function_name = tool_call.function.name
+    arguments = orjson.loads(tool_call.function.arguments)
+    result = await asyncio.to_thread(available_functions[function_name], **arguments)
+    return {"role": "tool", "tool_call_id": tool_call.id, "content": orjson.dumps(result).decode()}
+
+
+async def answer_question(question: str) -> str:
+    """Run one full tool-calling conversation for a single question."""
+    async with semaphore:
+        messages = [
+            {"role": "system", "content": "You are a tourism chatbot."},
+            {"role": "user", "content": question},
+        ]
+        response = await cached_create_async(
+            client,
+            model=MODEL_NAME,
+            messages=messages,
+            tools=tools,
+            tool_choice="auto",
+        )
+        if not response.choices[0].message.tool_calls:
+            return response.choices[0].message.content
+
+        tool_calls = response.choices[0].message.tool_calls
+        # Minimal dicts built by attribute access; appending the pydantic
+        # message would re-run its full serialization on the follow-up call.
+        messages.append(
+            {
+                "role": "assistant",
+                "content": response.choices[0].message.content or "",
+                "tool_calls": [
+                    {
+                        "id": tc.id,
+                        "type": "function",
+                        "function": {"name": tc.function.name, "arguments": tc.function.arguments},
+                    }
+                    for tc in tool_calls
+                ],
+            }
+        )
+        tool_messages = await asyncio.gather(
+            *[run_tool(tc) for tc in tool_calls if tc.function.name in available_functions]
+        )
+        messages.extend(tool_messages)
+        followup = await cached_create_async(client, model=MODEL_NAME, messages=messages, tools=tools)
+        return followup.choices[0].message.content
+
+
+async def run_batch(conversations: dict[str, list[dict]], tool_choice: str = "auto") -> dict[str, dict]:
+    """Submit one /v1/batches job for the given conversations and collect results.
+
+    Returns the assistant message (as a plain dict) per custom_id. One JSONL
+    upload amortizes per-request overhead across every line, and the server
+    schedules the work within the completion window. A completed batch can
+    still carry per-line failures — those land in the error file, not the
+    output file, so callers must treat a missing custom_id as a failure.
+    """
+    lines = b"\n".join(
+        orjson.dumps(
+            {
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {"model": MODEL_NAME, "messages": messages, "tools": tools, "tool_choice": tool_choice},
+            }
+        )
+        for custom_id, messages in conversations.items()
+    )
+    batch_file = await client.files.create(file=("batch.jsonl", lines), purpose="batch")
+    batch = await client.batches.create(
+        input_file_id=batch_file.id, endpoint="/v1/chat/completions", completion_window="24h"
+    )
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        await asyncio.sleep(BATCH_POLL_SECONDS)
+        batch = await client.batches.retrieve(batch.id)
+    if batch.status != "completed":
+        raise RuntimeError(f"Batch {batch.id} finished as {batch.status}")
+    output = await client.files.content(batch.output_file_id)
+    results = {}
+    for line in output.text.splitlines():
+        entry = orjson.loads(line)
+        results[entry["custom_id"]] = entry["response"]["body"]["choices"][0]["message"]
+    return results
+
+
+async def answer_questions_batched() -> list[str]:
+    """Answer every question through the offline Batch API.
+
+    Two batch jobs cover the whole set: one for the first turns, then — after
+    running the requested tools locally — one for the follow-ups of the
+    conversations that asked for tools.
+    """
+    conversations = {
+        str(index): [
+            {"role": "system", "content": "You are a tourism chatbot."},
+            {"role": "user", "content": question},
+        ]
+        for index, question in enumerate(questions)
+    }
+    answers: dict[str, str] = {}
+    followups: dict[str, list[dict]] = {}
+    first_results = await run_batch(conversations)
+    for custom_id, messages in conversations.items():
+        message = first_results.get(custom_id)
+        if message is None:
+            answers[custom_id] = "ERROR: batch request failed; see the batch error file"
+            continue
+        tool_calls = message.get("tool_calls")
+        if not tool_calls:
+            answers[custom_id] = message.get("content") or ""
+            continue
+        messages.append({"role": "assistant", "content": message.get("content") or "", "tool_calls": tool_calls})
+        for tool_call in tool_calls:
+            function_name = tool_call["function"]["name"]
+            if function_name in available_functions:
+                result = available_functions[function_name](**orjson.loads(tool_call["function"]["arguments"]))
+                messages.append(
+                    {"role": "tool", "tool_call_id": tool_call["id"], "content": orjson.dumps(result).decode()}
+                )
+        followups[custom_id] = messages
+    if followups:
+        # tool_choice="none" forces the follow-up to synthesize an answer
+        # instead of possibly requesting another round of tools, which an
+        # offline batch has no way to serve.
+        followup_results = await run_batch(followups, tool_choice="none")
+        for custom_id in followups:
+            message = followup_results.get(custom_id)
+            if message is None:
+                answers[custom_id] = "ERROR: batch request failed; see the batch error file"
+            else:
+                answers[custom_id] = message.get("content") or ""
+    return [answers[str(index)] for index in range(len(questions))]
+
+
+async def main():
+    print(f"Model: {MODEL_NAME} on Host: {API_HOST}\n")
+    if USE_BATCH_API:
+        answers = await answer_questions_batched()
+    else:
+        answers = await asyncio.gather(*[answer_question(question) for question in questions])
+    for question, answer in zip(questions, answers):
+        print(f"Q: {question}")
+        print(f"A: {answer}\n")
+
+
+if __name__ == "__main__":
+
+    async def runner():
+        try:
+            await main()
+        finally:
+            await close_async_client()
+
+    asyncio.run(runner())
@@ -1,8 +1,8 @@
-import json
 import os
 
 import azure.identity
 import openai
+import orjson
 from dotenv import load_dotenv
 
 # Setup the OpenAI client to use either Azure, OpenAI.com, or Ollama API
@@ -79,7 +79,7 @@ print(f"Response from {MODEL_NAME} on {API_HOST}: \n")
 if response.choices[0].message.tool_calls:
     tool_call = response.choices[0].message.tool_calls[0]
     function_name = tool_call.function.name
-    arguments = json.loads(tool_call.function.arguments)
+    arguments = orjson.loads(tool_call.function.arguments)
     if function_name == "lookup_weather":
         lookup_weather(**arguments)
 else:
@@ -1,42 +1,31 @@
-import json
-import os
+import asyncio
 from collections.abc import Callable
 from typing import Any
 
-import azure.identity
-import openai
-from dotenv import load_dotenv
-
-# Setup the OpenAI client to use either Azure, OpenAI.com, or Ollama API
-load_dotenv(override=True)
-API_HOST = os.getenv("API_HOST", "github")
-
-if API_HOST == "azure":
-    token_provider = azure.identity.get_bearer_token_provider(
-        azure.identity.DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
-    )
-    client = openai.OpenAI(
-        base_url=os.environ["AZURE_OPENAI_ENDPOINT"],
-        api_key=token_provider,
-    )
-    MODEL_NAME = os.environ["AZURE_OPENAI_CHAT_DEPLOYMENT"]
-
-elif API_HOST == "ollama":
-    client = openai.OpenAI(base_url=os.environ["OLLAMA_ENDPOINT"], api_key="nokeyneeded")
-    MODEL_NAME = os.environ["OLLAMA_MODEL"]
-
-elif API_HOST == "github":
-    client = openai.OpenAI(base_url="https://models.github.ai/inference", api_key=os.environ["GITHUB_TOKEN"])
-    MODEL_NAME = os.getenv("GITHUB_MODEL", "openai/gpt-4o")
+from openai_client import (
+    cached_create_async,
+    close_async_client,
+    get_api_host,
+    get_async_client,
+    json_dumps,
+    json_loads,
+)
 
-else:
-    client = openai.OpenAI(api_key=os.environ["OPENAI_KEY"])
-    MODEL_NAME = os.environ["OPENAI_MODEL"]
+# Client construction (including .env loading and Azure credential discovery)
+# happens once in the shared module, not per script.
+client, MODEL_NAME = get_async_client()
+API_HOST = get_api_host()
 
 
 # ---------------------------------------------------------------------------
 # Tool implementation(s)
 # ---------------------------------------------------------------------------
+# Precomputed validation constants: the frozenset and type tuple are built
+# once at import instead of on every tool invocation.
+VALID_OPERATORS = frozenset({">", "<", ">=", "<=", "="})
+NUMERIC_TYPES = (int, float)
+
+
 def search_database(search_query: str, price_filter: dict | None = None) -> dict[str, str]:
     """Search database for relevant products based on user query"""
     if not search_query:
@@ -44,9 +33,9 @@ def search_database(search_query: str, price_filter: dict | None = None) -> dict
     if price_filter:
         if "comparison_operator" not in price_filter or "value" not in price_filter:
             raise ValueError("Both comparison_operator and value are required in price_filter")
-        if price_filter["comparison_operator"] not in {">", "<", ">=", "<=", "="}:
+        if price_filter["comparison_operator"] not in VALID_OPERATORS:
             raise ValueError("Invalid comparison_operator in price_filter")
-        if not isinstance(price_filter["value"], int | float):
+        if not isinstance(price_filter["value"], NUMERIC_TYPES):
             raise ValueError("Value in price_filter must be a number")
     return [{"id": "123", "name": "Example Product", "price": 19.99}]
 
@@ -55,7 +44,25 @@ tool_mapping: dict[str, Callable[..., Any]] = {
     "search_database": search_database,
 }
 
-tools = [
+
+def dump_tool_call(tool_call) -> dict:
+    """Pack a tool call into the dict shape the API expects.
+
+    Equivalent to tool_call.model_dump(), minus Pydantic's reflective
+    field traversal on every call.
+    """
+    return {
+        "id": tool_call.id,
+        "type": "function",
+        "function": {"name": tool_call.function.name, "arguments": tool_call.function.arguments},
+    }
+
+
+# Advertised to the model on both calls. Server-side prompt caches hash the
+# request prefix (tools first, then messages) byte-for-byte, so this exact
+# object is passed unchanged to the follow-up call — never rebuild it per
+# request — letting the second call reuse the first call's prefill state.
+tools = (
     {
         "type": "function",
         "function": {
@@ -86,85 +93,101 @@ tools = [
                 "required": ["search_query"],
             },
         },
-    }
-]
+    },
+)
 
 messages: list[dict[str, Any]] = [
     {"role": "system", "content": "You are a product search assistant."},
     {"role": "user", "content": "Find me a red shirt under $20."},
 ]
 
-print(f"Model: {MODEL_NAME} on Host: {API_HOST}\n")
 
-# First model response (may include tool call)
-response = client.chat.completions.create(
-    model=MODEL_NAME,
-    messages=messages,
-    tools=tools,
-    tool_choice="auto",
-    parallel_tool_calls=False,
-)
+async def main():
+    print(f"Model: {MODEL_NAME} on Host: {API_HOST}\n")
 
-assistant_msg = response.choices[0].message
-
-# If no tool calls were requested, just print the answer.
-if not assistant_msg.tool_calls:
-    print("Assistant:")
-    print(assistant_msg.content)
-else:
-    # Append assistant message including tool call metadata
-    messages.append(
-        {
-            "role": "assistant",
-            "content": assistant_msg.content or "",
-            "tool_calls": [tc.model_dump() for tc in assistant_msg.tool_calls],
-        }
+    # First model response (may include tool call)
+    response = await cached_create_async(
+        client,
+        model=MODEL_NAME,
+        messages=messages,
+        tools=tools,
+        tool_choice="auto",
+        parallel_tool_calls=False,
     )
 
-    # Process each requested tool sequentially (though usually one here)
-    for tool_call in assistant_msg.tool_calls:
-        fn_name = tool_call.function.name
-        raw_args = tool_call.function.arguments or "{}"
-        print(f"Tool request: {fn_name}({raw_args})")
-
-        target = tool_mapping.get(fn_name)
-        if not target:
-            tool_result: Any = f"ERROR: No implementation registered for tool '{fn_name}'"
-        else:
-            # Parse arguments safely
-            try:
-                parsed_args = json.loads(raw_args) if raw_args.strip() else {}
-            except json.JSONDecodeError:
-                parsed_args = {}
-                tool_result = "Warning: Malformed JSON arguments received; proceeding with empty args"
-            else:
-                try:
-                    tool_result = target(**parsed_args)
-                except Exception as e:  # safeguard tool execution
-                    tool_result = f"Tool execution error in {fn_name}: {e}"
-
-        # Serialize tool output (dict or str) as JSON string for the model
-        try:
-            tool_content = json.dumps(tool_result)
-        except Exception:
-            # Fallback to string conversion if something isn't JSON serializable
-            tool_content = json.dumps({"result": str(tool_result)})
+    assistant_msg = response.choices[0].message
 
+    # If no tool calls were requested, just print the answer.
+    if not assistant_msg.tool_calls:
+        print("Assistant:")
+        print(assistant_msg.content)
+    else:
+        # Append assistant message including tool call metadata
         messages.append(
             {
-                "role": "tool",
-                "tool_call_id": tool_call.id,
-                "name": fn_name,
-                "content": tool_content,
+                "role": "assistant",
+                "content": assistant_msg.content or "",
+                "tool_calls": [dump_tool_call(tc) for tc in assistant_msg.tool_calls],
             }
         )
 
-    # Follow-up model response after supplying tool outputs
-    followup = client.chat.completions.create(
-        model=MODEL_NAME,
-        messages=messages,
-        tools=tools,
-    )
-    final_msg = followup.choices[0].message
-    print("Assistant (final):")
-    print(final_msg.content)
+        # Process each requested tool sequentially (though usually one here)
+        for tool_call in assistant_msg.tool_calls:
+            fn_name = tool_call.function.name
+            raw_args = tool_call.function.arguments or "{}"
+            print(f"Tool request: {fn_name}({raw_args})")
+
+            target = tool_mapping.get(fn_name)
+            if not target:
+                tool_result: Any = f"ERROR: No implementation registered for tool '{fn_name}'"
+            else:
+                # Parse arguments safely
+                try:
+                    parsed_args = json_loads(raw_args) if raw_args.strip() else {}
+                except ValueError:
+                    parsed_args = {}
+                    tool_result = "Warning: Malformed JSON arguments received; proceeding with empty args"
+                else:
+                    try:
+                        tool_result = target(**parsed_args)
+                    except Exception as e:  # safeguard tool execution
+                        tool_result = f"Tool execution error in {fn_name}: {e}"
+
+            # Serialize tool output (dict or str) as JSON string for the
+            # model; default=str stringifies anything non-serializable in one
+            # pass, with no exception-driven fallback on the happy path.
+            tool_content = json_dumps(tool_result, default=str)
+
+            messages.append(
+                {
+                    "role": "tool",
+                    "tool_call_id": tool_call.id,
+                    "name": fn_name,
+                    "content": tool_content,
+                }
+            )
+
+        # Follow-up model response after supplying tool outputs, streamed so
+        # tokens render as they arrive instead of after the full generation.
+        followup_stream = await client.chat.completions.create(
+            model=MODEL_NAME,
+            messages=messages,
+            tools=tools,
+            stream=True,
+        )
+        print("Assistant (final):")
+        async for chunk in followup_stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                print(chunk.choices[0].delta.content, end="", flush=True)
+        print()
+
+
+if __name__ == "__main__":
+
+    async def runner():
+        try:
+            await main()
+        finally:
+            await close_async_client()
+
+    asyncio.run(runner())
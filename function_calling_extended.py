@@ -1,8 +1,8 @@
-import json
 import os
 
 import azure.identity
 import openai
+import orjson
 from dotenv import load_dotenv
 
 # Setup the OpenAI client to use either Azure, OpenAI.com, or Ollama API
@@ -85,11 +85,26 @@ print(f"Response from {MODEL_NAME} on {API_HOST}: \n")
 if response.choices[0].message.tool_calls:
     tool_call = response.choices[0].message.tool_calls[0]
     function_name = tool_call.function.name
-    arguments = json.loads(tool_call.function.arguments)
+    arguments = orjson.loads(tool_call.function.arguments)
 
     if function_name == "lookup_weather":
-        messages.append(response.choices[0].message)
+        # Minimal dict built by attribute access: appending the pydantic
+        # message object would put its full serialization machinery on the
+        # request path every follow-up call.
+        messages.append(
+            {
+                "role": "assistant",
+                "content": response.choices[0].message.content or "",
+                "tool_calls": [
+                    {
+                        "id": tool_call.id,
+                        "type": "function",
+                        "function": {"name": function_name, "arguments": tool_call.function.arguments},
+                    }
+                ],
+            }
+        )
         result = lookup_weather(**arguments)
-        messages.append({"role": "tool", "tool_call_id": tool_call.id, "content": str(result)})
+        messages.append({"role": "tool", "tool_call_id": tool_call.id, "content": orjson.dumps(result).decode()})
         response = client.chat.completions.create(model=MODEL_NAME, messages=messages, tools=tools)
         print(response.choices[0].message.content)
@@ -1,37 +1,18 @@
-import json
-import os
+import asyncio
+import re
 from collections.abc import Callable
 from typing import Any
 
-import azure.identity
-import openai
-from dotenv import load_dotenv
+import fastjsonschema
+import orjson
+import tiktoken
 
-# Setup the OpenAI client to use either Azure, OpenAI.com, or Ollama API
-load_dotenv(override=True)
-API_HOST = os.getenv("API_HOST", "github")
+from openai_client import cached_create_async, close_async_client, get_api_host, get_async_client
 
-if API_HOST == "azure":
-    token_provider = azure.identity.get_bearer_token_provider(
-        azure.identity.DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
-    )
-    client = openai.OpenAI(
-        base_url=os.environ["AZURE_OPENAI_ENDPOINT"],
-        api_key=token_provider,
-    )
-    MODEL_NAME = os.environ["AZURE_OPENAI_CHAT_DEPLOYMENT"]
-
-elif API_HOST == "ollama":
-    client = openai.OpenAI(base_url=os.environ["OLLAMA_ENDPOINT"], api_key="nokeyneeded")
-    MODEL_NAME = os.environ["OLLAMA_MODEL"]
-
-elif API_HOST == "github":
-    client = openai.OpenAI(base_url="https://models.github.ai/inference", api_key=os.environ["GITHUB_TOKEN"])
-    MODEL_NAME = os.getenv("GITHUB_MODEL", "openai/gpt-4o")
-
-else:
-    client = openai.OpenAI(api_key=os.environ["OPENAI_KEY"])
-    MODEL_NAME = os.environ["OPENAI_MODEL"]
+# Client construction (including .env loading and Azure credential discovery)
+# happens once in the shared module, not per script.
+client, MODEL_NAME = get_async_client()
+API_HOST = get_api_host()
 
 
 # ---------------------------------------------------------------------------
@@ -39,15 +20,12 @@ else:
 # ---------------------------------------------------------------------------
 def search_database(search_query: str, price_filter: dict | None = None) -> dict[str, str]:
     """Search database for relevant products based on user query"""
-    if not search_query:
-        raise ValueError("search_query is required")
+    arguments = {"search_query": search_query}
     if price_filter:
-        if "comparison_operator" not in price_filter or "value" not in price_filter:
-            raise ValueError("Both comparison_operator and value are required in price_filter")
-        if price_filter["comparison_operator"] not in {">", "<", ">=", "<=", "="}:
-            raise ValueError("Invalid comparison_operator in price_filter")
-        if not isinstance(price_filter["value"], int | float):
-            raise ValueError("Value in price_filter must be a number")
+        arguments["price_filter"] = price_filter
+    # Raises a ValueError subclass on invalid arguments, same as the old
+    # hand-written checks, but compiled once from the advertised schema.
+    validate_search_arguments(arguments)
     return [{"id": "123", "name": "Example Product", "price": 19.99}]
 
 
@@ -55,7 +33,25 @@ tool_mapping: dict[str, Callable[..., Any]] = {
     "search_database": search_database,
 }
 
-tools = [
+
+def dump_tool_call(tool_call) -> dict:
+    """Pack a tool call into the dict shape the API expects.
+
+    Equivalent to tool_call.model_dump(), minus Pydantic's reflective
+    field traversal on every call.
+    """
+    return {
+        "id": tool_call.id,
+        "type": "function",
+        "function": {"name": tool_call.function.name, "arguments": tool_call.function.arguments},
+    }
+
+
+# Advertised to the model on both calls. Server-side prompt caches hash the
+# request prefix (tools first, then messages) byte-for-byte, so this exact
+# object is passed unchanged to the follow-up call — never rebuild it per
+# request — letting the second call reuse the first call's prefill state.
+tools = (
     {
         "type": "function",
         "function": {
@@ -67,6 +63,7 @@ tools = [
                     "search_query": {
                         "type": "string",
                         "description": "Query string to use for full text search, e.g. 'red shoes'",
+                        "minLength": 1,
                     },
                     "price_filter": {
                         "type": "object",
@@ -74,22 +71,30 @@ tools = [
                         "properties": {
                             "comparison_operator": {
                                 "type": "string",
-                                "description": "Operator to compare the column value, either '>', '<', '>=', '<=', '='",  # noqa
+                                "description": "Operator to compare the column value",
+                                "enum": [">", "<", ">=", "<=", "="],
                             },
                             "value": {
                                 "type": "number",
                                 "description": "Value to compare against, e.g. 30",
                             },
                         },
+                        "required": ["comparison_operator", "value"],
                     },
                 },
                 "required": ["search_query"],
             },
         },
-    }
-]
+    },
+)
 
-messages: list[dict[str, Any]] = [
+# Compiled once at import; validates tool arguments against the exact schema
+# advertised to the model, so local checks can never drift from it.
+validate_search_arguments = fastjsonschema.compile(tools[0]["function"]["parameters"])
+
+# Static few-shot prefix: built once and never mutated, so the conversation
+# list below only ever appends after it.
+FEWSHOT_MESSAGES: list[dict[str, Any]] = [
     {"role": "system", "content": "You are a product search assistant."},
     {"role": "user", "content": "good options for climbing gear that can be used outside?"},
     {
@@ -130,80 +135,197 @@ messages: list[dict[str, Any]] = [
         "name": "search_database",
         "content": "Search results for shoes cheaper than 50: ...",
     },
-    {"role": "user", "content": "Find me a red shirt under $20."},
 ]
 
-print(f"Model: {MODEL_NAME} on Host: {API_HOST}\n")
+# The few-shot prefix is static, so its token cost is measured once at import
+# instead of on every window-fit check; only the turns after it get tokenized
+# per call. The Encoding object is module-level too — building one loads the
+# whole BPE rank table, which is far more expensive than using it.
+try:
+    _ENCODING = tiktoken.encoding_for_model(MODEL_NAME)
+except KeyError:
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+_PREFIX_LEN = len(_ENCODING.encode(orjson.dumps(FEWSHOT_MESSAGES).decode()))
+CONTEXT_WINDOW = 128_000
+RESPONSE_MARGIN = 4_000
+
+
+def trim_to_context_window(messages: list[dict[str, Any]]) -> None:
+    """Drop the oldest post-few-shot turn groups until the prompt fits the window.
+
+    A turn group is a user message plus every assistant/tool message up to
+    the next user message. Groups are removed whole: dropping single
+    messages could leave a tool message without the assistant tool_calls
+    message that requested it, which the API rejects. The newest group (the
+    turn being answered) is never dropped.
+    """
+    start = len(FEWSHOT_MESSAGES)
+    while len(messages) > start + 1:
+        suffix = orjson.dumps(messages[start:]).decode()
+        if _PREFIX_LEN + len(_ENCODING.encode(suffix)) <= CONTEXT_WINDOW - RESPONSE_MARGIN:
+            break
+        end = start + 1
+        while end < len(messages) and messages[end]["role"] != "user":
+            end += 1
+        if end >= len(messages):
+            break
+        del messages[start:end]
+
+
+# Known query shapes compile straight to a tool call, skipping the planning
+# model call entirely — the model is only consulted once, for the synthesis.
+# Each entry maps a pattern over the user turn to a search_database arguments
+# builder.
+_FAST_PATHS: list[tuple[re.Pattern, Callable[[re.Match], dict]]] = [
+    (
+        re.compile(r"find me an? (.+?) (?:under|less than|cheaper than) \$?(\d+)", re.IGNORECASE),
+        lambda match: {
+            "search_query": match[1],
+            "price_filter": {"comparison_operator": "<", "value": int(match[2])},
+        },
+    ),
+]
+
+
+def match_fast_path(user_text: str) -> dict | None:
+    """Return search_database arguments if the user turn matches a known shape."""
+    for pattern, build_arguments in _FAST_PATHS:
+        if match := pattern.search(user_text):
+            return build_arguments(match)
+    return None
+
+
+messages: list[dict[str, Any]] = [
+    *FEWSHOT_MESSAGES,
+    {"role": "user", "content": "Find me a red shirt under $20."},
+]
 
-# First model response (may include tool call)
-response = client.chat.completions.create(
-    model=MODEL_NAME,
-    messages=messages,
-    tools=tools,
-    tool_choice="auto",
-    parallel_tool_calls=False,
-)
 
-assistant_msg = response.choices[0].message
-
-# If no tool calls were requested, just print the answer.
-if not assistant_msg.tool_calls:
-    print("Assistant:")
-    print(assistant_msg.content)
-else:
-    # Append assistant message including tool call metadata
-    messages.append(
-        {
-            "role": "assistant",
-            "content": assistant_msg.content or "",
-            "tool_calls": [tc.model_dump() for tc in assistant_msg.tool_calls],
-        }
+async def stream_final_answer():
+    """Stream the synthesis response for the current conversation state."""
+    trim_to_context_window(messages)
+    followup_stream = await client.chat.completions.create(
+        model=MODEL_NAME,
+        messages=messages,
+        tools=tools,
+        stream=True,
     )
+    print("Assistant (final):")
+    async for chunk in followup_stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            print(chunk.choices[0].delta.content, end="", flush=True)
+    print()
 
-    # Process each requested tool sequentially (though usually one here)
-    for tool_call in assistant_msg.tool_calls:
-        fn_name = tool_call.function.name
-        raw_args = tool_call.function.arguments or "{}"
-        print(f"Tool request: {fn_name}({raw_args})")
-
-        target = tool_mapping.get(fn_name)
-        if not target:
-            tool_result: Any = f"ERROR: No implementation registered for tool '{fn_name}'"
-        else:
-            # Parse arguments safely
-            try:
-                parsed_args = json.loads(raw_args) if raw_args.strip() else {}
-            except json.JSONDecodeError:
-                parsed_args = {}
-                tool_result = "Warning: Malformed JSON arguments received; proceeding with empty args"
-            else:
-                try:
-                    tool_result = target(**parsed_args)
-                except Exception as e:  # safeguard tool execution
-                    tool_result = f"Tool execution error in {fn_name}: {e}"
 
-        # Serialize tool output (dict or str) as JSON string for the model
-        try:
-            tool_content = json.dumps(tool_result)
-        except Exception:
-            # Fallback to string conversion if something isn't JSON serializable
-            tool_content = json.dumps({"result": str(tool_result)})
+async def main():
+    print(f"Model: {MODEL_NAME} on Host: {API_HOST}\n")
 
+    # Fast path: a recognized query shape builds the tool call locally and
+    # goes straight to synthesis — one model round trip instead of two.
+    if (fast_arguments := match_fast_path(messages[-1]["content"])) is not None:
+        print(f"Fast path: search_database({fast_arguments})")
+        raw_arguments = orjson.dumps(fast_arguments).decode()
+        messages.append(
+            {
+                "role": "assistant",
+                "content": "",
+                "tool_calls": [
+                    {
+                        "id": "call_fastpath_1",
+                        "type": "function",
+                        "function": {"name": "search_database", "arguments": raw_arguments},
+                    }
+                ],
+            }
+        )
+        try:
+            fast_result: Any = search_database(**fast_arguments)
+        except Exception as e:  # same safeguard as the model-planned path
+            fast_result = f"Tool execution error in search_database: {e}"
         messages.append(
             {
                 "role": "tool",
-                "tool_call_id": tool_call.id,
-                "name": fn_name,
-                "content": tool_content,
+                "tool_call_id": "call_fastpath_1",
+                "name": "search_database",
+                "content": orjson.dumps(fast_result).decode(),
             }
         )
+        await stream_final_answer()
+        return
 
-    # Follow-up model response after supplying tool outputs
-    followup = client.chat.completions.create(
+    trim_to_context_window(messages)
+
+    # First model response (may include tool call)
+    response = await cached_create_async(
+        client,
         model=MODEL_NAME,
         messages=messages,
         tools=tools,
+        tool_choice="auto",
+        parallel_tool_calls=False,
     )
-    final_msg = followup.choices[0].message
-    print("Assistant (final):")
-    print(final_msg.content)
+
+    assistant_msg = response.choices[0].message
+
+    # If no tool calls were requested, just print the answer.
+    if not assistant_msg.tool_calls:
+        print("Assistant:")
+        print(assistant_msg.content)
+    else:
+        # Append assistant message including tool call metadata
+        messages.append(
+            {
+                "role": "assistant",
+                "content": assistant_msg.content or "",
+                "tool_calls": [dump_tool_call(tc) for tc in assistant_msg.tool_calls],
+            }
+        )
+
+        # Process each requested tool sequentially (though usually one here)
+        for tool_call in assistant_msg.tool_calls:
+            fn_name = tool_call.function.name
+            raw_args = tool_call.function.arguments or "{}"
+            print(f"Tool request: {fn_name}({raw_args})")
+
+            target = tool_mapping.get(fn_name)
+            if not target:
+                tool_result: Any = f"ERROR: No implementation registered for tool '{fn_name}'"
+            else:
+                # Parse arguments safely
+                try:
+                    parsed_args = orjson.loads(raw_args) if raw_args.strip() else {}
+                except orjson.JSONDecodeError:
+                    parsed_args = {}
+                    tool_result = "Warning: Malformed JSON arguments received; proceeding with empty args"
+                else:
+                    try:
+                        tool_result = target(**parsed_args)
+                    except Exception as e:  # safeguard tool execution
+                        tool_result = f"Tool execution error in {fn_name}: {e}"
+
+            # Serialize tool output (dict or str) as JSON string for the
+            # model; default=str stringifies anything non-serializable in one
+            # pass, with no exception-driven fallback on the happy path.
+            tool_content = orjson.dumps(tool_result, default=str).decode()
+
+            messages.append(
+                {
+                    "role": "tool",
+                    "tool_call_id": tool_call.id,
+                    "name": fn_name,
+                    "content": tool_content,
+                }
+            )
+
+        await stream_final_answer()
+
+
+if __name__ == "__main__":
+
+    async def runner():
+        try:
+            await main()
+        finally:
+            await close_async_client()
+
+    asyncio.run(runner())
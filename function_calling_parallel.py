@@ -1,39 +1,18 @@
-import json
-import os
-from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import re
+import sys
 
-import azure.identity
-import openai
-from dotenv import load_dotenv
+import orjson
 
-# Setup the OpenAI client to use either Azure, OpenAI.com, or Ollama API
-load_dotenv(override=True)
-API_HOST = os.getenv("API_HOST", "github")
+from openai_client import close_async_client, get_api_host, get_async_client
 
-if API_HOST == "azure":
-    token_provider = azure.identity.get_bearer_token_provider(
-        azure.identity.DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
-    )
-    client = openai.OpenAI(
-        base_url=os.environ["AZURE_OPENAI_ENDPOINT"],
-        api_key=token_provider,
-    )
-    MODEL_NAME = os.environ["AZURE_OPENAI_CHAT_DEPLOYMENT"]
-
-elif API_HOST == "ollama":
-    client = openai.OpenAI(base_url=os.environ["OLLAMA_ENDPOINT"], api_key="nokeyneeded")
-    MODEL_NAME = os.environ["OLLAMA_MODEL"]
-
-elif API_HOST == "github":
-    client = openai.OpenAI(base_url="https://models.github.ai/inference", api_key=os.environ["GITHUB_TOKEN"])
-    MODEL_NAME = os.getenv("GITHUB_MODEL", "openai/gpt-4o")
-
-else:
-    client = openai.OpenAI(api_key=os.environ["OPENAI_KEY"])
-    MODEL_NAME = os.environ["OPENAI_MODEL"]
+# Client construction (including .env loading and Azure credential discovery)
+# happens once in the shared module, not per script.
+client, MODEL_NAME = get_async_client()
+API_HOST = get_api_host()
 
 
-tools = [
+tools = (
     {
         "type": "function",
         "function": {
@@ -76,16 +55,20 @@ tools = [
             },
         },
     },
-]
+)
 
 
 # ---------------------------------------------------------------------------
 # Tool (function) implementations
 # ---------------------------------------------------------------------------
-def lookup_weather(city_name: str | None = None, zip_code: str | None = None) -> str:
+# Native coroutines: real implementations would await an HTTP client here, so
+# each call is cooperatively scheduled on the event loop with no worker
+# thread per tool. Duplicate calls within a turn are shared below, which
+# covers what the old per-function lru_cache did for a single run.
+async def lookup_weather(city_name: str | None = None, zip_code: str | None = None) -> dict:
     """Looks up the weather for given city_name and zip_code."""
     location = city_name or zip_code or "unknown"
-    # In a real implementation, call an external weather API here.
+    # In a real implementation, await an external weather API here.
     return {
         "location": location,
         "condition": "rain showers",
@@ -94,10 +77,10 @@ def lookup_weather(city_name: str | None = None, zip_code: str | None = None) ->
     }
 
 
-def lookup_movies(city_name: str | None = None, zip_code: str | None = None) -> str:
+async def lookup_movies(city_name: str | None = None, zip_code: str | None = None) -> dict:
     """Returns a list of movies playing in the given location."""
     location = city_name or zip_code or "unknown"
-    # A real implementation could query a cinema listings API.
+    # A real implementation could await a cinema listings API.
     return {
         "location": location,
         "movies": [
@@ -112,14 +95,6 @@ messages = [
     {"role": "system", "content": "You are a tourism chatbot."},
     {"role": "user", "content": "is it rainy enough in sydney to watch movies and which ones are on?"},
 ]
-response = client.chat.completions.create(
-    model=MODEL_NAME,
-    messages=messages,
-    tools=tools,
-    tool_choice="auto",
-)
-
-print(f"Response from {MODEL_NAME} on {API_HOST}: \n")
 
 # Map function names to actual functions
 available_functions = {
@@ -127,34 +102,184 @@ available_functions = {
     "lookup_movies": lookup_movies,
 }
 
-# Execute all tool calls in parallel using ThreadPoolExecutor
-if response.choices[0].message.tool_calls:
-    tool_calls = response.choices[0].message.tool_calls
-    print(f"Model requested {len(tool_calls)} tool call(s):\n")
-
-    # Add the assistant's message (with tool calls) to the conversation
-    messages.append(response.choices[0].message)
-
-    with ThreadPoolExecutor() as executor:
-        # Submit all tool calls to the thread pool
-        futures = []
-        for tool_call in tool_calls:
-            function_name = tool_call.function.name
-            arguments = json.loads(tool_call.function.arguments)
-            print(f"Tool request: {function_name}({arguments})")
-
-            if function_name in available_functions:
-                future = executor.submit(available_functions[function_name], **arguments)
-                futures.append((tool_call, function_name, future))
-
-        # Add each tool result to the conversation
-        for tool_call, function_name, future in futures:
-            result = future.result()
-            messages.append({"role": "tool", "tool_call_id": tool_call.id, "content": json.dumps(result)})
-
-    # Get final response from the model with all tool results
-    final_response = client.chat.completions.create(model=MODEL_NAME, messages=messages, tools=tools)
-    print("Assistant:")
-    print(final_response.choices[0].message.content)
-else:
-    print(response.choices[0].message.content)
+
+def tool_message(tool_call_id: str, name: str, content: str) -> dict:
+    """Build a tool-role message with a fixed shape and stable key order."""
+    return {"role": "tool", "tool_call_id": tool_call_id, "name": name, "content": content}
+
+
+async def execute_tool(function_name: str, arguments: dict) -> str:
+    """Execute one requested tool and serialize its result."""
+    # CPU-bound tools would use asyncio.to_thread here; these are I/O-shaped.
+    result = await available_functions[function_name](**arguments)
+    return orjson.dumps(result).decode()
+
+
+# Keyword heuristics over the user turn: phrases that all but guarantee the
+# model will request a given tool. Matching tools are pre-launched before the
+# first model call so their latency hides behind the model's inference; a
+# guess the model doesn't request is simply cancelled.
+SPECULATION_RULES = (
+    (re.compile(r"rain|weather|sunny", re.IGNORECASE), "lookup_weather"),
+    (re.compile(r"movie|cinema|film", re.IGNORECASE), "lookup_movies"),
+)
+CITY_PATTERN = re.compile(r"\bin ([a-z]+)", re.IGNORECASE)
+
+
+def speculative_tasks(user_text: str) -> dict[tuple, asyncio.Task]:
+    """Pre-launch tools the user turn strongly suggests, keyed like dispatch."""
+    city_match = CITY_PATTERN.search(user_text)
+    if not city_match:
+        return {}
+    # Title-case matches how models normalize place names in arguments, so
+    # the speculative key lines up with the model's eventual request.
+    guessed_arguments = {"city_name": city_match[1].title()}
+    key_suffix = orjson.dumps(guessed_arguments, option=orjson.OPT_SORT_KEYS)
+    return {
+        (function_name, key_suffix): asyncio.create_task(execute_tool(function_name, guessed_arguments))
+        for pattern, function_name in SPECULATION_RULES
+        if pattern.search(user_text)
+    }
+
+
+def arguments_complete(raw: str) -> bool:
+    """True once a streamed arguments fragment has closed its top-level object."""
+    depth = 0
+    in_string = False
+    escaped = False
+    for char in raw:
+        if escaped:
+            escaped = False
+        elif char == "\\" and in_string:
+            escaped = True
+        elif char == '"':
+            in_string = not in_string
+        elif not in_string:
+            if char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+                if depth == 0:
+                    return True
+    return False
+
+
+async def main():
+    # Pre-launch the tools the user turn already implies, racing them against
+    # the model call below; if the model requests a matching call, its result
+    # is ready the moment the arguments finish streaming.
+    tasks_by_key: dict[tuple, asyncio.Task] = speculative_tasks(messages[-1]["content"])
+
+    # Stream the first call so each tool can start the moment its argument
+    # JSON closes, overlapping tool latency with the model still decoding
+    # the rest of its tool calls.
+    stream = await client.chat.completions.create(
+        model=MODEL_NAME,
+        messages=messages,
+        tools=tools,
+        tool_choice="auto",
+        stream=True,
+    )
+
+    print(f"Response from {MODEL_NAME} on {API_HOST}: \n")
+
+    # Models sometimes emit the same call twice in one turn; run one task
+    # per unique (name, canonical-arguments) pair so duplicates share a
+    # single execution instead of re-running the tool.
+    tool_calls_by_index: dict[int, dict] = {}
+    requested_calls: list[tuple[dict, str, tuple]] = []
+    content_parts: list[str] = []
+    # Log lines are buffered and written once: concurrent tasks would other-
+    # wise interleave their prints, and each print is its own write syscall.
+    tool_log: list[str] = []
+
+    def dispatch(index: int) -> None:
+        """Launch a completed tool call's task if it hasn't started yet."""
+        tool_call = tool_calls_by_index[index]
+        raw_args = tool_call["function"]["arguments"]
+        if tool_call.get("dispatched") or not arguments_complete(raw_args):
+            return
+        tool_call["dispatched"] = True
+        function_name = tool_call["function"]["name"]
+        if function_name not in available_functions:
+            return
+        arguments = orjson.loads(raw_args)
+        tool_log.append(f"Tool request: {function_name}({arguments})\n")
+        key = (function_name, orjson.dumps(arguments, option=orjson.OPT_SORT_KEYS))
+        if key not in tasks_by_key:
+            tasks_by_key[key] = asyncio.create_task(execute_tool(function_name, arguments))
+        requested_calls.append((tool_call, function_name, key))
+
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            content_parts.append(delta.content)
+        for tc_delta in delta.tool_calls or []:
+            tool_call = tool_calls_by_index.setdefault(
+                tc_delta.index, {"id": "", "type": "function", "function": {"name": "", "arguments": ""}}
+            )
+            if tc_delta.id:
+                tool_call["id"] = tc_delta.id
+            if tc_delta.function.name:
+                tool_call["function"]["name"] += tc_delta.function.name
+            if tc_delta.function.arguments:
+                tool_call["function"]["arguments"] += tc_delta.function.arguments
+                dispatch(tc_delta.index)
+
+    if tool_calls_by_index:
+        sys.stdout.write(f"Model requested {len(tool_calls_by_index)} tool call(s):\n\n" + "".join(tool_log))
+        sys.stdout.flush()
+
+        # Add the assistant's message (with tool calls) to the conversation
+        messages.append(
+            {
+                "role": "assistant",
+                "content": "".join(content_parts),
+                "tool_calls": [
+                    {"id": tc["id"], "type": "function", "function": tc["function"]}
+                    for tc in (tool_calls_by_index[index] for index in sorted(tool_calls_by_index))
+                ],
+            }
+        )
+
+        # Settle only the calls the model actually made; speculative guesses
+        # it never requested are cancelled instead of awaited.
+        requested_keys = {key for _, _, key in requested_calls}
+        for key, task in tasks_by_key.items():
+            if key not in requested_keys:
+                task.cancel()
+        if requested_keys:
+            await asyncio.gather(*(tasks_by_key[key] for key in requested_keys))
+
+        # Append results in the model-emitted order; every duplicate
+        # tool_call_id receives the same shared result.
+        for tool_call, function_name, key in requested_calls:
+            messages.append(tool_message(tool_call["id"], function_name, tasks_by_key[key].result()))
+
+        # Get final response from the model with all tool results, streamed
+        # so tokens render as they arrive instead of after the full generation
+        final_stream = await client.chat.completions.create(
+            model=MODEL_NAME, messages=messages, tools=tools, stream=True
+        )
+        print("Assistant:")
+        async for chunk in final_stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                print(chunk.choices[0].delta.content, end="", flush=True)
+        print()
+    else:
+        for task in tasks_by_key.values():
+            task.cancel()  # no tool calls at all; drop every speculative guess
+        print("".join(content_parts))
+
+
+if __name__ == "__main__":
+
+    async def runner():
+        try:
+            await main()
+        finally:
+            await close_async_client()
+
+    asyncio.run(runner())
@@ -0,0 +1,152 @@
+import asyncio
+import os
+
+import orjson
+
+from openai_client import cached_create_async, close_async_client, get_api_host, get_async_client
+
+# Client construction (including .env loading and Azure credential discovery)
+# happens once in the shared module, not per script.
+client, MODEL_NAME = get_async_client()
+API_HOST = get_api_host()
+
+# Planning only picks tools and extracts arguments — a task cheap models
+# handle well — so it can be routed to a smaller model (e.g.
+# PLANNER_MODEL=gpt-4o-mini) while the user-facing synthesis keeps the main
+# one. Defaults to the main model so every API host works unconfigured.
+PLANNER_MODEL = os.getenv("PLANNER_MODEL", MODEL_NAME)
+
+
+# ---------------------------------------------------------------------------
+# Tool (function) implementations
+# ---------------------------------------------------------------------------
+async def lookup_weather(city_name: str | None = None, zip_code: str | None = None) -> dict:
+    """Looks up the weather for given city_name and zip_code."""
+    location = city_name or zip_code or "unknown"
+    # In a real implementation, await an external weather API here.
+    return {
+        "location": location,
+        "condition": "rain showers",
+        "rain_mm_last_24h": 7,
+        "recommendation": "Good day for indoor activities if you dislike drizzle.",
+    }
+
+
+async def lookup_movies(city_name: str | None = None, zip_code: str | None = None) -> dict:
+    """Returns a list of movies playing in the given location."""
+    location = city_name or zip_code or "unknown"
+    # A real implementation could await a cinema listings API.
+    return {
+        "location": location,
+        "movies": [
+            {"title": "The Quantum Reef", "rating": "PG-13"},
+            {"title": "Storm Over Harbour Bay", "rating": "PG"},
+            {"title": "Midnight Koala", "rating": "R"},
+        ],
+    }
+
+
+tool_mapping = {
+    "lookup_weather": lookup_weather,
+    "lookup_movies": lookup_movies,
+}
+
+# Instead of the usual "call model → run tools → call model again" loop, one
+# planning call emits every tool invocation up front as a dependency graph.
+# Independent tasks run concurrently, dependent tasks start the moment their
+# inputs finish, and a single synthesis call turns the observations into the
+# final answer — two model round trips regardless of how many tools run.
+PLANNER_PROMPT = """\
+You are a planner. Decompose the user's question into calls to these tools:
+- lookup_weather(city_name, zip_code): weather for a city name or zip code
+- lookup_movies(city_name, zip_code): movies playing in a city name or zip code
+Respond with JSON only, in this exact shape:
+{"tasks": [{"id": 1, "tool": "lookup_weather", "args": {"city_name": "..."}, "depends_on": []}]}
+A task that needs an earlier task's output lists that id in depends_on and
+writes "$<id>" as the argument value to substitute.
+"""
+
+question = "Is it rainy enough in Sydney to watch movies and which ones are on?"
+
+
+async def run_task(task: dict, handles: dict[int, "asyncio.Task[str]"]) -> str:
+    """Execute one planned tool call once its dependencies have finished.
+
+    Awaiting the dependency tasks directly is the whole scheduler: tasks with
+    no depends_on start immediately and run concurrently, while dependent
+    tasks suspend until their inputs exist, then substitute any "$<id>"
+    argument placeholders with the dependency's observation.
+    """
+    args = task["args"]
+    if depends_on := task.get("depends_on"):
+        resolved = {dep: await handles[dep] for dep in depends_on if dep in handles}
+        args = {
+            key: (
+                resolved[int(value[1:])]
+                if isinstance(value, str)
+                and value.startswith("$")
+                and value[1:].isdigit()
+                and int(value[1:]) in resolved
+                else value
+            )
+            for key, value in args.items()
+        }
+    print(f"Running task {task['id']}: {task['tool']}({args})")
+    result = await tool_mapping[task["tool"]](**args)
+    return orjson.dumps(result).decode()
+
+
+async def main():
+    print(f"Model: {MODEL_NAME} on Host: {API_HOST}\n")
+
+    # 1. Planning call: one cheap structured response lists every tool task.
+    plan_response = await cached_create_async(
+        client,
+        model=PLANNER_MODEL,
+        messages=[
+            {"role": "system", "content": PLANNER_PROMPT},
+            {"role": "user", "content": question},
+        ],
+        response_format={"type": "json_object"},
+    )
+    tasks = orjson.loads(plan_response.choices[0].message.content).get("tasks", [])
+    if not tasks:
+        print(plan_response.choices[0].message.content)
+        return
+
+    # 2. Schedule the whole graph at once; the dict is fully populated before
+    # any task body runs, so forward dependency references resolve safely.
+    handles: dict[int, asyncio.Task[str]] = {}
+    for task in tasks:
+        handles[task["id"]] = asyncio.create_task(run_task(task, handles))
+    results = await asyncio.gather(*[handles[task["id"]] for task in tasks])
+    observations = "\n".join(
+        f"{task['tool']}({orjson.dumps(task['args']).decode()}) -> {result}" for task, result in zip(tasks, results)
+    )
+
+    # 3. A single synthesis call folds all observations into the answer,
+    # streamed so tokens render as they arrive.
+    synthesis_stream = await client.chat.completions.create(
+        model=MODEL_NAME,
+        messages=[
+            {"role": "system", "content": "You are a tourism chatbot. Answer using the tool observations provided."},
+            {"role": "user", "content": f"{question}\n\nTool observations:\n{observations}"},
+        ],
+        stream=True,
+    )
+    print("\nAssistant:")
+    async for chunk in synthesis_stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            print(chunk.choices[0].delta.content, end="", flush=True)
+    print()
+
+
+if __name__ == "__main__":
+
+    async def runner():
+        try:
+            await main()
+        finally:
+            await close_async_client()
+
+    asyncio.run(runner())
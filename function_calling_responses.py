@@ -0,0 +1,145 @@
+import asyncio
+
+import orjson
+
+from openai_client import close_async_client, get_api_host, get_async_client
+
+# Client construction (including .env loading and Azure credential discovery)
+# happens once in the shared module, not per script.
+client, MODEL_NAME = get_async_client()
+API_HOST = get_api_host()
+
+
+# ---------------------------------------------------------------------------
+# Tool (function) implementations
+# ---------------------------------------------------------------------------
+async def lookup_weather(city_name: str | None = None, zip_code: str | None = None) -> dict:
+    """Looks up the weather for given city_name and zip_code."""
+    location = city_name or zip_code or "unknown"
+    # In a real implementation, await an external weather API here.
+    return {
+        "location": location,
+        "condition": "rain showers",
+        "rain_mm_last_24h": 7,
+        "recommendation": "Good day for indoor activities if you dislike drizzle.",
+    }
+
+
+async def lookup_movies(city_name: str | None = None, zip_code: str | None = None) -> dict:
+    """Returns a list of movies playing in the given location."""
+    location = city_name or zip_code or "unknown"
+    # A real implementation could await a cinema listings API.
+    return {
+        "location": location,
+        "movies": [
+            {"title": "The Quantum Reef", "rating": "PG-13"},
+            {"title": "Storm Over Harbour Bay", "rating": "PG"},
+            {"title": "Midnight Koala", "rating": "R"},
+        ],
+    }
+
+
+available_functions = {
+    "lookup_weather": lookup_weather,
+    "lookup_movies": lookup_movies,
+}
+
+# The Responses API takes a flat function shape (no nested "function" object).
+# Built once at module load and passed by reference on every request.
+tools = (
+    {
+        "type": "function",
+        "name": "lookup_weather",
+        "description": "Lookup the weather for a given city name or zip code.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "city_name": {"type": "string", "description": "The city name"},
+                "zip_code": {"type": "string", "description": "The zip code"},
+            },
+            "additionalProperties": False,
+        },
+    },
+    {
+        "type": "function",
+        "name": "lookup_movies",
+        "description": "Lookup movies playing in a given city name or zip code.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "city_name": {"type": "string", "description": "The city name"},
+                "zip_code": {"type": "string", "description": "The zip code"},
+            },
+            "additionalProperties": False,
+        },
+    },
+)
+
+
+async def run_turn(new_input: list[dict], previous_response_id: str | None) -> str:
+    """Run one conversation turn, chaining server-side state between requests.
+
+    Passing previous_response_id means each request uploads only the new
+    items for the turn — the provider replays the stored history itself, so
+    upload size stays constant per turn instead of growing with the whole
+    conversation. Tool outputs go back the same way, as function_call_output
+    items chained onto the response that requested them.
+    """
+    response = await client.responses.create(
+        model=MODEL_NAME,
+        input=new_input,
+        tools=tools,
+        previous_response_id=previous_response_id,
+    )
+
+    while function_calls := [item for item in response.output if item.type == "function_call"]:
+        results = await asyncio.gather(
+            *[available_functions[call.name](**orjson.loads(call.arguments)) for call in function_calls]
+        )
+        for call, result in zip(function_calls, results):
+            print(f"Tool request: {call.name}({call.arguments})")
+        response = await client.responses.create(
+            model=MODEL_NAME,
+            input=[
+                {"type": "function_call_output", "call_id": call.call_id, "output": orjson.dumps(result).decode()}
+                for call, result in zip(function_calls, results)
+            ],
+            tools=tools,
+            previous_response_id=response.id,
+        )
+
+    print("Assistant:")
+    print(response.output_text)
+    return response.id
+
+
+async def main():
+    print(f"Model: {MODEL_NAME} on Host: {API_HOST}\n")
+
+    # First turn: instructions plus the user question.
+    last_id = await run_turn(
+        [
+            {"role": "system", "content": "You are a tourism chatbot."},
+            {"role": "user", "content": "Is it rainy enough in Sydney to watch movies and which ones are on?"},
+        ],
+        previous_response_id=None,
+    )
+
+    # Second turn: only the new user message travels over the wire; the
+    # server already holds the first turn's messages and tool outputs.
+    print()
+    await run_turn(
+        [{"role": "user", "content": "Which of those movies would suit kids?"}],
+        previous_response_id=last_id,
+    )
+
+
+if __name__ == "__main__":
+
+    async def runner():
+        try:
+            await main()
+        finally:
+            await close_async_client()
+
+    asyncio.run(runner())
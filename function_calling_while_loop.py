@@ -1,38 +1,24 @@
-import json
+import atexit
+import functools
+import hashlib
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-import azure.identity
-import openai
-from dotenv import load_dotenv
+import msgspec
+import orjson
 
-# Setup the OpenAI client to use either Azure, OpenAI.com, or Ollama API
-load_dotenv(override=True)
-API_HOST = os.getenv("API_HOST", "github")
+from openai_client import cached_create, get_api_host, get_client
 
-if API_HOST == "azure":
-    token_provider = azure.identity.get_bearer_token_provider(
-        azure.identity.DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
-    )
-    client = openai.OpenAI(
-        base_url=os.environ["AZURE_OPENAI_ENDPOINT"],
-        api_key=token_provider,
-    )
-    MODEL_NAME = os.environ["AZURE_OPENAI_CHAT_DEPLOYMENT"]
-
-elif API_HOST == "ollama":
-    client = openai.OpenAI(base_url=os.environ["OLLAMA_ENDPOINT"], api_key="nokeyneeded")
-    MODEL_NAME = os.environ["OLLAMA_MODEL"]
-
-elif API_HOST == "github":
-    client = openai.OpenAI(base_url="https://models.github.ai/inference", api_key=os.environ["GITHUB_TOKEN"])
-    MODEL_NAME = os.getenv("GITHUB_MODEL", "openai/gpt-4o")
+# Client construction (including .env loading, Azure credential discovery,
+# and the pooled HTTP connection reused across every turn of the loop below)
+# happens once in the shared module, not per script.
+client, MODEL_NAME = get_client()
+API_HOST = get_api_host()
 
-else:
-    client = openai.OpenAI(api_key=os.environ["OPENAI_KEY"])
-    MODEL_NAME = os.environ["OPENAI_MODEL"]
 
-
-tools = [
+# Built once at module load and passed by reference on every turn; a tuple so
+# the loop below cannot rebuild or mutate it.
+tools = (
     {
         "type": "function",
         "function": {
@@ -75,95 +61,327 @@ tools = [
             },
         },
     },
-]
+)
+
+# Canonical bytes of the advertised schema, serialized once; the debug prompt
+# hash below folds these in instead of re-serializing the tools every turn.
+TOOLS_BYTES = orjson.dumps(tools, option=orjson.OPT_SORT_KEYS)
 
 
 # ---------------------------------------------------------------------------
 # Tool (function) implementations
 # ---------------------------------------------------------------------------
+# Each tool's return shape is fixed, so its JSON output is pre-templated with
+# only the location serialized per call — no generic serializer walk over the
+# full payload. Tools return the finished string; callers append it as message
+# content without a second serialization pass.
+_WEATHER_TEMPLATE = (
+    '{"location":%s,"condition":"rain showers","rain_mm_last_24h":7,'
+    '"recommendation":"Good day for indoor activities if you dislike drizzle."}'
+)
+_MOVIES_TEMPLATE = (
+    '{"location":%s,"movies":[{"title":"The Quantum Reef","rating":"PG-13"},'
+    '{"title":"Storm Over Harbour Bay","rating":"PG"},{"title":"Midnight Koala","rating":"R"}]}'
+)
+
+
+@functools.lru_cache(maxsize=256)
 def lookup_weather(city_name: str | None = None, zip_code: str | None = None) -> str:
     """Looks up the weather for given city_name and zip_code."""
     location = city_name or zip_code or "unknown"
     # In a real implementation, call an external weather API here.
-    return {
-        "location": location,
-        "condition": "rain showers",
-        "rain_mm_last_24h": 7,
-        "recommendation": "Good day for indoor activities if you dislike drizzle.",
-    }
+    return _WEATHER_TEMPLATE % orjson.dumps(location).decode()
 
 
+@functools.lru_cache(maxsize=256)
 def lookup_movies(city_name: str | None = None, zip_code: str | None = None) -> str:
     """Returns a list of movies playing in the given location."""
     location = city_name or zip_code or "unknown"
     # A real implementation could query a cinema listings API.
-    return {
-        "location": location,
-        "movies": [
-            {"title": "The Quantum Reef", "rating": "PG-13"},
-            {"title": "Storm Over Harbour Bay", "rating": "PG"},
-            {"title": "Midnight Koala", "rating": "R"},
-        ],
-    }
-
-
-tool_mapping = {
-    "lookup_weather": lookup_weather,
-    "lookup_movies": lookup_movies,
+    return _MOVIES_TEMPLATE % orjson.dumps(location).decode()
+
+
+class LookupArgs(msgspec.Struct):
+    """Typed argument shape shared by both lookup tools."""
+
+    city_name: str | None = None
+    zip_code: str | None = None
+
+
+# Decoder compiled once for the struct: parse and validation happen in one
+# C-level pass straight into typed attributes, with no intermediate dict.
+_decode_lookup_args = msgspec.json.Decoder(LookupArgs).decode
+
+
+def _make_dispatcher(tool):
+    """Bind one tool into a raw-arguments dispatcher at import time.
+
+    Both tools share the fixed LookupArgs shape, so the closure decodes the
+    raw string directly into the struct and calls its already-bound tool
+    positionally — no per-call table lookup of the target, no intermediate
+    dict, and no kwargs expansion.
+    """
+
+    def dispatch(raw_args: str) -> str:
+        args = _decode_lookup_args(raw_args)
+        return tool(args.city_name, args.zip_code)
+
+    return dispatch
+
+
+# Maps tool name -> dispatcher taking the raw argument string and returning
+# the serialized result, built once from the schema order.
+DISPATCH = {
+    spec["function"]["name"]: _make_dispatcher(tool) for spec, tool in zip(tools, (lookup_weather, lookup_movies))
 }
 
 
+def tool_message(tool_call_id: str, name: str, content: str) -> dict:
+    """Build a tool-role message with a fixed shape and stable key order."""
+    return {"role": "tool", "tool_call_id": tool_call_id, "name": name, "content": content}
+
+
+def arguments_complete(raw: str) -> bool:
+    """True once a streamed arguments fragment has closed its top-level object."""
+    depth = 0
+    in_string = False
+    escaped = False
+    for char in raw:
+        if escaped:
+            escaped = False
+        elif char == "\\" and in_string:
+            escaped = True
+        elif char == '"':
+            in_string = not in_string
+        elif not in_string:
+            if char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+                if depth == 0:
+                    return True
+    return False
+
+
+@functools.lru_cache(maxsize=256)
+def parse_arguments(raw_args: str) -> tuple[dict, str]:
+    """Parse an arguments string into (args dict, canonical cache key).
+
+    Models repeat the same argument strings across turns (and "{}" constantly),
+    so memoizing on the raw string keeps the parser and the canonical re-dump
+    off the hot path for everything but first sightings. Callers must not
+    mutate the returned dict — it is shared across cache hits.
+    """
+    if raw_args == "{}":
+        return {}, "{}"
+    parsed_args = orjson.loads(raw_args)
+    return parsed_args, orjson.dumps(parsed_args, option=orjson.OPT_SORT_KEYS).decode()
+
+
 # ---------------------------------------------------------------------------
 # Conversation loop
 # ---------------------------------------------------------------------------
+# The static head of the conversation. Server-side prompt caches hash the
+# request prefix byte-for-byte, so these messages (like the tools list above)
+# must stay at the exact front of every request, unmodified and in the same
+# order — the loop only ever appends after them. That lets each turn reuse
+# the prefill KV state of the previous one instead of restarting it.
+PREFIX_MESSAGES = (
+    {
+        "role": "system",
+        "content": "You are a tourism chatbot. When the user asks about multiple independent facts"
+        " about a location, request all the relevant tools in a single turn.",
+    },
+)
+
 messages = [
-    {"role": "system", "content": "You are a tourism chatbot."},
+    *PREFIX_MESSAGES,
     {"role": "user", "content": "Is it rainy enough in Sydney to watch movies and which ones are on?"},
 ]
 
 print(f"Model: {MODEL_NAME} on Host: {API_HOST}\n")
 
+# A single worker pool reused across turns: threads are created once per
+# process instead of once per turn, and the pool is sized for the handful of
+# tool calls (plus one speculative model call) a turn can carry rather than
+# the default min(32, cpu_count + 4).
+EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tool")
+atexit.register(EXECUTOR.shutdown)
+
+# Messages are always built with the same key order (role first, content,
+# then tool fields), so identical conversations serialize to identical bytes
+# across runs — a requirement for server-side prefix caches to hit. Set
+# DEBUG_PROMPT_HASH=1 to verify: the hash must be stable between re-runs.
+DEBUG_PROMPT_HASH = os.getenv("DEBUG_PROMPT_HASH") is not None
+
+
+def report_cached_tokens(usage) -> None:
+    """Print the provider-reported cached prefix tokens for this request.
+
+    OpenAI and Azure cache ≥1024-token request prefixes automatically; a
+    nonzero cached_tokens count on later turns confirms the stable prefix
+    above is actually being reused server-side, so prefill only covers the
+    new tokens of the turn. Hosts without the field just stay quiet.
+    """
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", None)
+    if cached_tokens is not None:
+        print(f"Cached prompt tokens: {cached_tokens}/{usage.prompt_tokens}")
+
+
+# Last observed result per (tool name, canonical arguments). When every call
+# in a turn has a cached result, the next model call is issued speculatively
+# with the guessed outputs while the real tools run — hiding tool latency
+# behind model latency. A wrong guess just discards the speculative response.
+speculation_cache: dict[tuple[str, str], str] = {}
+speculative_response = None
+
 while True:
-    print("Calling model...\n")
-    response = client.chat.completions.create(
-        model=MODEL_NAME,
-        messages=messages,  # includes prior tool outputs
-        tools=tools,
-        tool_choice="auto",
-        parallel_tool_calls=False,  # ensure sequential tool calls
-    )
+    if DEBUG_PROMPT_HASH:
+        prompt_bytes = TOOLS_BYTES + orjson.dumps(messages, option=orjson.OPT_SORT_KEYS)
+        prompt_hash = hashlib.sha256(prompt_bytes).hexdigest()
+        print(f"Prompt hash: {prompt_hash[:16]}")
+
+    content_parts: list[str] = []
+    if speculative_response is not None:
+        # A committed speculative call already holds this turn's response.
+        assistant_message = speculative_response.choices[0].message
+        if DEBUG_PROMPT_HASH and speculative_response.usage is not None:
+            report_cached_tokens(speculative_response.usage)
+        speculative_response = None
+        if assistant_message.content:
+            print("Assistant:")
+            print(assistant_message.content, end="", flush=True)
+            content_parts.append(assistant_message.content)
+        tool_calls = [
+            {
+                "id": tc.id,
+                "type": "function",
+                "function": {"name": tc.function.name, "arguments": tc.function.arguments},
+            }
+            for tc in assistant_message.tool_calls or []
+        ]
+        futures_by_index = {}
+        ordered_indexes = list(range(len(tool_calls)))
+    else:
+        print("Calling model...\n")
+        stream = client.chat.completions.create(
+            model=MODEL_NAME,
+            messages=messages,  # includes prior tool outputs
+            tools=tools,
+            tool_choice="auto",
+            stream=True,
+            # Usage (with the cached-token split) arrives in a final extra
+            # chunk; only request it when we're going to print it.
+            **({"stream_options": {"include_usage": True}} if DEBUG_PROMPT_HASH else {}),
+        )
+
+        # Accumulate the streamed deltas: answer tokens print as they arrive,
+        # while tool-call fragments are stitched together keyed by index. The
+        # moment an individual call's argument JSON closes, its tool is
+        # submitted to the pool — by the time the stream ends, every tool the
+        # model requested is already running instead of waiting for the full
+        # response, overlapping tool latency with the model's remaining decode.
+        tool_calls_by_index: dict[int, dict] = {}
+        futures_by_index = {}
+        for chunk in stream:
+            if chunk.usage is not None:
+                report_cached_tokens(chunk.usage)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                if not content_parts:
+                    print("Assistant:")
+                content_parts.append(delta.content)
+                print(delta.content, end="", flush=True)
+            for tc_delta in delta.tool_calls or []:
+                tool_call = tool_calls_by_index.setdefault(
+                    tc_delta.index, {"id": "", "type": "function", "function": {"name": "", "arguments": ""}}
+                )
+                if tc_delta.id:
+                    tool_call["id"] = tc_delta.id
+                if tc_delta.function.name:
+                    tool_call["function"]["name"] += tc_delta.function.name
+                if tc_delta.function.arguments:
+                    tool_call["function"]["arguments"] += tc_delta.function.arguments
+                    if (
+                        tc_delta.index not in futures_by_index
+                        and (dispatch := DISPATCH.get(tool_call["function"]["name"])) is not None
+                        and arguments_complete(tool_call["function"]["arguments"])
+                    ):
+                        futures_by_index[tc_delta.index] = EXECUTOR.submit(dispatch, tool_call["function"]["arguments"])
+
+        ordered_indexes = sorted(tool_calls_by_index)
+        tool_calls = [tool_calls_by_index[index] for index in ordered_indexes]
 
-    assistant_message = response.choices[0].message
     # If the assistant returned standard content with no tool calls, we're done.
-    if not assistant_message.tool_calls:
-        print("Assistant:")
-        print(assistant_message.content)
+    if not tool_calls:
+        print()
         break
 
-    # Append the assistant tool request message to conversation
+    # Append the assistant tool request message to conversation.
     messages.append(
         {
             "role": "assistant",
-            "content": assistant_message.content or "",
-            "tool_calls": [tc.model_dump() for tc in assistant_message.tool_calls],
+            "content": "".join(content_parts),
+            "tool_calls": tool_calls,
         }
     )
 
-    # Execute each requested tool sequentially.
-    for tool_call in assistant_message.tool_calls:
-        fn_name = tool_call.function.name
-        raw_args = tool_call.function.arguments or "{}"
+    # Parse each requested call once up front, keyed for the speculation cache.
+    call_specs = []
+    for tool_call in tool_calls:
+        fn_name = tool_call["function"]["name"]
+        raw_args = tool_call["function"]["arguments"] or "{}"
         print(f"Tool request: {fn_name}({raw_args})")
-        target_tool = tool_mapping.get(fn_name)
-        parsed_args = json.loads(raw_args)
-        tool_result = target_tool(**parsed_args)
-        tool_result_str = json.dumps(tool_result)
-        # Provide the tool output back to the model
-        messages.append(
-            {
-                "role": "tool",
-                "tool_call_id": tool_call.id,
-                "name": fn_name,
-                "content": tool_result_str,
-            }
+        _, canonical_args = parse_arguments(raw_args)
+        call_specs.append((tool_call, fn_name, raw_args, (fn_name, canonical_args)))
+
+    # Tools dispatched mid-stream are already running; anything left (calls
+    # from the speculative non-streamed path, or names the mid-stream check
+    # couldn't resolve) is submitted now, so the turn still costs
+    # max(tool latency) instead of the sum.
+    futures = []
+    for position, (tool_call, fn_name, raw_args, cache_key) in enumerate(call_specs):
+        future = futures_by_index.get(ordered_indexes[position])
+        if future is None:
+            future = EXECUTOR.submit(DISPATCH[fn_name], raw_args)
+        futures.append((tool_call, fn_name, cache_key, future))
+
+    # If every call has a previously observed result, guess those results
+    # and start the next model call now, racing the real tool execution.
+    guesses = {cache_key: speculation_cache.get(cache_key) for _, _, _, cache_key in call_specs}
+    speculative_future = None
+    if all(guess is not None for guess in guesses.values()):
+        speculative_messages = [
+            *messages,
+            *(tool_message(tc["id"], fn, guesses[key]) for tc, fn, _, key in call_specs),
+        ]
+        speculative_future = EXECUTOR.submit(
+            functools.partial(cached_create, client),
+            model=MODEL_NAME,
+            messages=speculative_messages,
+            tools=tools,
+            tool_choice="auto",
         )
+
+    # Collect real results in the order the model requested them, so the
+    # tool messages line up with the assistant's tool_calls.
+    guesses_matched = True
+    for tool_call, fn_name, cache_key, future in futures:
+        tool_result_str = future.result()  # tools return pre-serialized JSON
+        if guesses.get(cache_key) != tool_result_str:
+            guesses_matched = False
+        speculation_cache[cache_key] = tool_result_str
+        # Provide the tool output back to the model
+        messages.append(tool_message(tool_call["id"], fn_name, tool_result_str))
+
+    if speculative_future is not None:
+        if guesses_matched:
+            # The guessed outputs were exactly right (deterministic tools
+            # always are), so the speculative response is this turn's model
+            # call — no extra round trip needed.
+            speculative_response = speculative_future.result()
+        else:
+            speculative_future.cancel()
@@ -0,0 +1,273 @@
+"""Shared OpenAI client setup for the demo scripts.
+
+Every demo needs the same "use Azure, OpenAI.com, GitHub Models, or Ollama"
+boilerplate. Building the client here, once per process, means .env parsing
+and credential discovery happen a single time — DefaultAzureCredential in
+particular probes several credential sources and can take hundreds of
+milliseconds per construction. The clients are also configured with a pooled
+HTTP connection, so repeated calls reuse sockets instead of re-handshaking.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+
+import httpx
+import openai
+from dotenv import load_dotenv
+
+# Best-available JSON implementation, resolved once at import time. orjson has
+# no wheels on some deployment targets (Alpine, some lambdas), so fall back to
+# ujson and then the stdlib; demos bind json_loads/json_dumps from here and get
+# the fastest implementation present without code changes. All three raise a
+# ValueError subclass on malformed input.
+try:
+    import orjson as _json_impl
+
+    json_loads = _json_impl.loads
+
+    def json_dumps(obj, default=None) -> str:
+        return _json_impl.dumps(obj, default=default).decode()
+
+except ImportError:
+    try:
+        import ujson as _json_impl  # type: ignore[no-redef]
+    except ImportError:
+        import json as _json_impl  # type: ignore[no-redef]
+
+    json_loads = _json_impl.loads
+
+    def json_dumps(obj, default=None) -> str:
+        return _json_impl.dumps(obj, default=default)
+
+
+# uvloop's libuv-based event loop is a drop-in upgrade for the async demos'
+# network-heavy workloads; where it isn't available (e.g. Windows) the
+# default loop is used unchanged.
+try:
+    import uvloop
+except ImportError:
+    pass
+else:
+    uvloop.install()
+
+
+@functools.cache
+def get_api_host() -> str:
+    """Load .env once and report which API host the demos should target."""
+    load_dotenv(override=True)
+    return os.getenv("API_HOST", "github")
+
+
+# Generous overall budget, but fail fast on connect: a dead or distant
+# network path should surface in seconds so the failover below can kick in,
+# not after a full request timeout.
+_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+
+@functools.cache
+def get_client() -> tuple[openai.OpenAI, str]:
+    """Build the sync client and model name for the configured API host."""
+    api_host = get_api_host()
+    # http2=True lets both sequential calls and parallel streams multiplex
+    # over one negotiated connection instead of opening new sockets.
+    http_client = httpx.Client(http2=True, limits=httpx.Limits(max_keepalive_connections=20), timeout=_TIMEOUT)
+
+    if api_host == "azure":
+        # Imported lazily: azure.identity is slow to import and only needed here.
+        import azure.identity
+
+        # Probe only the credential sources these demos run under (env vars,
+        # workload/managed identity, Azure CLI, azd); each excluded source is
+        # one less sequential probe — some involving subprocess spawns — on
+        # the first token fetch.
+        credential = azure.identity.DefaultAzureCredential(
+            exclude_interactive_browser_credential=True,
+            exclude_visual_studio_code_credential=True,
+            exclude_shared_token_cache_credential=True,
+            exclude_powershell_credential=True,
+        )
+        token_provider = azure.identity.get_bearer_token_provider(
+            credential, "https://cognitiveservices.azure.com/.default"
+        )
+        client = openai.OpenAI(
+            base_url=os.environ["AZURE_OPENAI_ENDPOINT"],
+            api_key=token_provider,
+            http_client=http_client,
+        )
+        model_name = os.environ["AZURE_OPENAI_CHAT_DEPLOYMENT"]
+    elif api_host == "ollama":
+        client = openai.OpenAI(base_url=os.environ["OLLAMA_ENDPOINT"], api_key="nokeyneeded", http_client=http_client)
+        model_name = os.environ["OLLAMA_MODEL"]
+    elif api_host == "github":
+        client = openai.OpenAI(
+            base_url="https://models.github.ai/inference", api_key=os.environ["GITHUB_TOKEN"], http_client=http_client
+        )
+        model_name = os.getenv("GITHUB_MODEL", "openai/gpt-4o")
+    else:
+        client = openai.OpenAI(api_key=os.environ["OPENAI_KEY"], http_client=http_client)
+        model_name = os.environ["OPENAI_MODEL"]
+    return client, model_name
+
+
+_async_azure_credential = None  # Held so close_async_client can close it properly.
+
+
+@functools.cache
+def get_async_client() -> tuple[openai.AsyncOpenAI, str]:
+    """Build the async client and model name for the configured API host."""
+    global _async_azure_credential
+    api_host = get_api_host()
+    http_client = httpx.AsyncClient(http2=True, limits=httpx.Limits(max_keepalive_connections=20), timeout=_TIMEOUT)
+
+    if api_host == "azure":
+        import azure.identity.aio
+
+        # Same constrained probe chain as the sync credential above.
+        _async_azure_credential = azure.identity.aio.DefaultAzureCredential(
+            exclude_interactive_browser_credential=True,
+            exclude_visual_studio_code_credential=True,
+            exclude_shared_token_cache_credential=True,
+            exclude_powershell_credential=True,
+        )
+        token_provider = azure.identity.aio.get_bearer_token_provider(
+            _async_azure_credential, "https://cognitiveservices.azure.com/.default"
+        )
+        client = openai.AsyncOpenAI(
+            base_url=os.environ["AZURE_OPENAI_ENDPOINT"],
+            api_key=token_provider,
+            http_client=http_client,
+        )
+        model_name = os.environ["AZURE_OPENAI_CHAT_DEPLOYMENT"]
+    elif api_host == "ollama":
+        client = openai.AsyncOpenAI(
+            base_url=os.environ["OLLAMA_ENDPOINT"], api_key="nokeyneeded", http_client=http_client
+        )
+        model_name = os.environ["OLLAMA_MODEL"]
+    elif api_host == "github":
+        client = openai.AsyncOpenAI(
+            base_url="https://models.github.ai/inference", api_key=os.environ["GITHUB_TOKEN"], http_client=http_client
+        )
+        model_name = os.getenv("GITHUB_MODEL", "openai/gpt-4o")
+    else:
+        client = openai.AsyncOpenAI(api_key=os.environ["OPENAI_KEY"], http_client=http_client)
+        model_name = os.environ["OPENAI_MODEL"]
+    return client, model_name
+
+
+@functools.cache
+def get_fallback_client() -> openai.OpenAI | None:
+    """Secondary endpoint for connection-level failover, if configured.
+
+    Set FALLBACK_BASE_URL (plus FALLBACK_API_KEY, and FALLBACK_MODEL if the
+    deployment names differ) to point at e.g. the same model in another
+    region; a request that can't connect or times out is retried there once.
+    """
+    get_api_host()  # make sure .env has been loaded before reading the variables
+    base_url = os.getenv("FALLBACK_BASE_URL")
+    if not base_url:
+        return None
+    http_client = httpx.Client(http2=True, limits=httpx.Limits(max_keepalive_connections=20), timeout=_TIMEOUT)
+    return openai.OpenAI(
+        base_url=base_url, api_key=os.getenv("FALLBACK_API_KEY", "nokeyneeded"), http_client=http_client
+    )
+
+
+@functools.cache
+def get_async_fallback_client() -> openai.AsyncOpenAI | None:
+    """Async counterpart of get_fallback_client."""
+    get_api_host()
+    base_url = os.getenv("FALLBACK_BASE_URL")
+    if not base_url:
+        return None
+    http_client = httpx.AsyncClient(http2=True, limits=httpx.Limits(max_keepalive_connections=20), timeout=_TIMEOUT)
+    return openai.AsyncOpenAI(
+        base_url=base_url, api_key=os.getenv("FALLBACK_API_KEY", "nokeyneeded"), http_client=http_client
+    )
+
+
+def _create_with_failover(client: openai.OpenAI, kwargs: dict):
+    """chat.completions.create, retried once on a fallback endpoint."""
+    try:
+        return client.chat.completions.create(**kwargs)
+    except openai.APIConnectionError:  # also covers APITimeoutError
+        fallback = get_fallback_client()
+        if fallback is None:
+            raise
+        kwargs["model"] = os.getenv("FALLBACK_MODEL", kwargs["model"])
+        return fallback.chat.completions.create(**kwargs)
+
+
+async def _create_with_failover_async(client: openai.AsyncOpenAI, kwargs: dict):
+    """Async counterpart of _create_with_failover."""
+    try:
+        return await client.chat.completions.create(**kwargs)
+    except openai.APIConnectionError:
+        fallback = get_async_fallback_client()
+        if fallback is None:
+            raise
+        kwargs["model"] = os.getenv("FALLBACK_MODEL", kwargs["model"])
+        return await fallback.chat.completions.create(**kwargs)
+
+
+def _request_cache_key(kwargs: dict) -> str:
+    """Canonical hash of a chat-completions request (model, messages, tools, ...)."""
+    return hashlib.sha256(json.dumps(kwargs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+@functools.cache
+def _response_cache() -> sqlite3.Connection | None:
+    """Open the sqlite response cache named by RESPONSE_CACHE, if configured."""
+    get_api_host()  # make sure .env has been loaded before reading the variable
+    cache_path = os.getenv("RESPONSE_CACHE")
+    if not cache_path:
+        return None
+    connection = sqlite3.connect(cache_path, check_same_thread=False)
+    connection.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT)")
+    return connection
+
+
+def cached_create(client: openai.OpenAI, **kwargs) -> "openai.types.chat.ChatCompletion":
+    """chat.completions.create with an optional on-disk response cache.
+
+    Set RESPONSE_CACHE=<path to a sqlite file> to reuse responses for
+    byte-identical requests across runs, so repeat demo invocations skip the
+    network entirely. Streaming requests always go to the API.
+    """
+    cache = _response_cache()
+    if cache is None or kwargs.get("stream"):
+        return _create_with_failover(client, kwargs)
+    key = _request_cache_key(kwargs)
+    row = cache.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+    if row:
+        return openai.types.chat.ChatCompletion.model_validate_json(row[0])
+    response = _create_with_failover(client, kwargs)
+    with cache:
+        cache.execute("INSERT OR REPLACE INTO responses VALUES (?, ?)", (key, response.model_dump_json()))
+    return response
+
+
+async def cached_create_async(client: openai.AsyncOpenAI, **kwargs) -> "openai.types.chat.ChatCompletion":
+    """Async counterpart of cached_create."""
+    cache = _response_cache()
+    if cache is None or kwargs.get("stream"):
+        return await _create_with_failover_async(client, kwargs)
+    key = _request_cache_key(kwargs)
+    row = cache.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+    if row:
+        return openai.types.chat.ChatCompletion.model_validate_json(row[0])
+    response = await _create_with_failover_async(client, kwargs)
+    with cache:
+        cache.execute("INSERT OR REPLACE INTO responses VALUES (?, ?)", (key, response.model_dump_json()))
+    return response
+
+
+async def close_async_client() -> None:
+    """Close the async client and (if applicable) the Azure credential."""
+    if get_async_client.cache_info().currsize:
+        client, _ = get_async_client()
+        await client.close()
+    if _async_azure_credential is not None:
+        await _async_azure_credential.close()
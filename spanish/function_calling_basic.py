@@ -1,37 +1,17 @@
-import os
+from openai_client import get_api_host, get_client
 
-import azure.identity
-import openai
-from dotenv import load_dotenv
+# La construcción del cliente (incluido el parseo de .env y el descubrimiento
+# de credenciales de Azure) ocurre una sola vez en el módulo compartido, no
+# por script, y reutiliza una conexión HTTP con pool entre llamadas.
+client, MODEL_NAME = get_client()
+API_HOST = get_api_host()
 
-# Configura el cliente de OpenAI para usar la API de Azure, OpenAI.com u Ollama
-load_dotenv(override=True)
-API_HOST = os.getenv("API_HOST", "github")
 
-if API_HOST == "azure":
-    token_provider = azure.identity.get_bearer_token_provider(
-        azure.identity.DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
-    )
-    client = openai.OpenAI(
-        base_url=os.environ["AZURE_OPENAI_ENDPOINT"],
-        api_key=token_provider,
-    )
-    MODEL_NAME = os.environ["AZURE_OPENAI_CHAT_DEPLOYMENT"]
-
-elif API_HOST == "ollama":
-    client = openai.OpenAI(base_url=os.environ["OLLAMA_ENDPOINT"], api_key="nokeyneeded")
-    MODEL_NAME = os.environ["OLLAMA_MODEL"]
-
-elif API_HOST == "github":
-    client = openai.OpenAI(base_url="https://models.github.ai/inference", api_key=os.environ["GITHUB_TOKEN"])
-    MODEL_NAME = os.getenv("GITHUB_MODEL", "openai/gpt-4o")
-
-else:
-    client = openai.OpenAI(api_key=os.environ["OPENAI_KEY"])
-    MODEL_NAME = os.environ["OPENAI_MODEL"]
-
-
-tools = [
+# Construido una sola vez al cargar el módulo y pasado por referencia en cada
+# petición; congelado como tupla para que no se reconstruya ni se mute entre
+# llamadas — un prefijo estable es lo que permite al proveedor cachear el
+# prefill entre la primera llamada y el follow-up.
+tools = (
     {
         "type": "function",
         "function": {
@@ -52,8 +32,8 @@ tools = [
                 "additionalProperties": False,
             },
         },
-    }
-]
+    },
+)
 
 response = client.chat.completions.create(
     model=MODEL_NAME,
@@ -1,42 +1,26 @@
-import json
-import os
 from collections.abc import Callable
 from typing import Any
 
-import azure.identity
-import openai
-from dotenv import load_dotenv
+import orjson
 
-# Setup del cliente OpenAI para usar Azure, OpenAI.com, Ollama o GitHub Models (según variables de entorno)
-load_dotenv(override=True)
-API_HOST = os.getenv("API_HOST", "github")
+from openai_client import get_api_host, get_client
 
-if API_HOST == "azure":
-    token_provider = azure.identity.get_bearer_token_provider(
-        azure.identity.DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
-    )
-    client = openai.OpenAI(
-        base_url=os.environ["AZURE_OPENAI_ENDPOINT"],
-        api_key=token_provider,
-    )
-    MODEL_NAME = os.environ["AZURE_OPENAI_CHAT_DEPLOYMENT"]
-
-elif API_HOST == "ollama":
-    client = openai.OpenAI(base_url=os.environ["OLLAMA_ENDPOINT"], api_key="nokeyneeded")
-    MODEL_NAME = os.environ["OLLAMA_MODEL"]
-
-elif API_HOST == "github":
-    client = openai.OpenAI(base_url="https://models.github.ai/inference", api_key=os.environ["GITHUB_TOKEN"])
-    MODEL_NAME = os.getenv("GITHUB_MODEL", "openai/gpt-4o")
-
-else:
-    client = openai.OpenAI(api_key=os.environ["OPENAI_KEY"])
-    MODEL_NAME = os.environ["OPENAI_MODEL"]
+# La construcción del cliente (incluido el parseo de .env y el descubrimiento
+# de credenciales de Azure) ocurre una sola vez en el módulo compartido, no
+# por script.
+client, MODEL_NAME = get_client()
+API_HOST = get_api_host()
 
 
 # ---------------------------------------------------------------------------
 # Implementación de la tool(s)
 # ---------------------------------------------------------------------------
+# Constantes de validación precalculadas: el frozenset y la tupla de tipos se
+# construyen una sola vez en lugar de en cada invocación de la tool.
+VALID_OPERATORS = frozenset({">", "<", ">=", "<=", "="})
+NUMERIC_TYPES = (int, float)
+
+
 def search_database(search_query: str, price_filter: dict | None = None) -> dict[str, str]:
     """Busca productos relevantes en la base de datos usando el query del usuario.
 
@@ -52,9 +36,9 @@ def search_database(search_query: str, price_filter: dict | None = None) -> dict
     if price_filter:
         if "comparison_operator" not in price_filter or "value" not in price_filter:
             raise ValueError("Se requieren comparison_operator y value en price_filter")
-        if price_filter["comparison_operator"] not in {">", "<", ">=", "<=", "="}:
+        if price_filter["comparison_operator"] not in VALID_OPERATORS:
             raise ValueError("comparison_operator inválido en price_filter")
-        if not isinstance(price_filter["value"], int | float):
+        if not isinstance(price_filter["value"], NUMERIC_TYPES):
             raise ValueError("value en price_filter debe ser numérico")
     return [{"id": "123", "name": "Producto Ejemplo", "price": 19.99}]
 
@@ -63,7 +47,25 @@ tool_mapping: dict[str, Callable[..., Any]] = {
     "search_database": search_database,
 }
 
-tools = [
+
+def dump_tool_call(tool_call) -> dict:
+    """Convierte una tool call al dict que espera la API.
+
+    Equivalente a tool_call.model_dump(), pero sin el recorrido reflexivo
+    de campos de Pydantic en cada invocación.
+    """
+    return {
+        "id": tool_call.id,
+        "type": "function",
+        "function": {"name": tool_call.function.name, "arguments": tool_call.function.arguments},
+    }
+
+
+# Construido una sola vez al cargar el módulo y pasado por referencia en cada
+# petición; congelado como tupla para que no se reconstruya ni se mute entre
+# llamadas — un prefijo estable es lo que permite al proveedor cachear el
+# prefill entre la primera llamada y el follow-up.
+tools = (
     {
         "type": "function",
         "function": {
@@ -94,8 +96,8 @@ tools = [
                 "required": ["search_query"],
             },
         },
-    }
-]
+    },
+)
 
 messages: list[dict[str, Any]] = [
     {"role": "system", "content": "Eres un assistant que ayuda a buscar productos."},
@@ -125,7 +127,7 @@ else:
         {
             "role": "assistant",
             "content": assistant_msg.content or "",
-            "tool_calls": [tc.model_dump() for tc in assistant_msg.tool_calls],
+            "tool_calls": [dump_tool_call(tc) for tc in assistant_msg.tool_calls],
         }
     )
 
@@ -141,8 +143,8 @@ else:
         else:
             # Parseo seguro de argumentos JSON
             try:
-                parsed_args = json.loads(raw_args) if raw_args.strip() else {}
-            except json.JSONDecodeError:
+                parsed_args = orjson.loads(raw_args) if raw_args.strip() else {}
+            except orjson.JSONDecodeError:
                 parsed_args = {}
                 tool_result = "Warning: JSON arguments malformados; sigo con args vacíos"
             else:
@@ -151,12 +153,10 @@ else:
                 except Exception as e:  # safeguard tool execution
                     tool_result = f"Error ejecutando la tool {fn_name}: {e}"
 
-        # Serializa el output de la tool (dict o str) como JSON string para el model
-        try:
-            tool_content = json.dumps(tool_result)
-        except Exception:
-            # Fallback a string si algo no es serializable a JSON
-            tool_content = json.dumps({"result": str(tool_result)})
+        # Serializa el output de la tool (dict o str) como JSON string para
+        # el modelo; default=str convierte a string lo que no sea serializable
+        # en una sola pasada, sin fallback basado en excepciones.
+        tool_content = orjson.dumps(tool_result, default=str).decode()
 
         messages.append(
             {
@@ -167,12 +167,17 @@ else:
             }
         )
 
-    # Segunda respuesta del model después de darle los tool outputs
-    followup = client.chat.completions.create(
+    # Segunda respuesta del modelo después de darle los tool outputs, en
+    # streaming para que los tokens se impriman conforme llegan en lugar de
+    # esperar la generación completa.
+    followup_stream = client.chat.completions.create(
         model=MODEL_NAME,
         messages=messages,
         tools=tools,
+        stream=True,
     )
-    final_msg = followup.choices[0].message
     print("Assistant (final):")
-    print(final_msg.content)
+    for chunk in followup_stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            print(chunk.choices[0].delta.content, end="", flush=True)
+    print()
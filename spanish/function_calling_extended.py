@@ -1,35 +1,12 @@
-import json
-import os
+import orjson
 
-import azure.identity
-import openai
-from dotenv import load_dotenv
+from openai_client import get_api_host, get_client
 
-# Configura el cliente de OpenAI para usar la API de Azure, OpenAI.com u Ollama
-load_dotenv(override=True)
-API_HOST = os.getenv("API_HOST", "github")
-
-if API_HOST == "azure":
-    token_provider = azure.identity.get_bearer_token_provider(
-        azure.identity.DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
-    )
-    client = openai.OpenAI(
-        base_url=os.environ["AZURE_OPENAI_ENDPOINT"],
-        api_key=token_provider,
-    )
-    MODEL_NAME = os.environ["AZURE_OPENAI_CHAT_DEPLOYMENT"]
-
-elif API_HOST == "ollama":
-    client = openai.OpenAI(base_url=os.environ["OLLAMA_ENDPOINT"], api_key="nokeyneeded")
-    MODEL_NAME = os.environ["OLLAMA_MODEL"]
-
-elif API_HOST == "github":
-    client = openai.OpenAI(base_url="https://models.github.ai/inference", api_key=os.environ["GITHUB_TOKEN"])
-    MODEL_NAME = os.getenv("GITHUB_MODEL", "openai/gpt-4o")
-
-else:
-    client = openai.OpenAI(api_key=os.environ["OPENAI_KEY"])
-    MODEL_NAME = os.environ["OPENAI_MODEL"]
+# La construcción del cliente (incluido el parseo de .env y el descubrimiento
+# de credenciales de Azure) ocurre una sola vez en el módulo compartido, no
+# por script, y reutiliza una conexión HTTP con pool entre llamadas.
+client, MODEL_NAME = get_client()
+API_HOST = get_api_host()
 
 
 def lookup_weather(city_name=None, zip_code=None):
@@ -42,7 +19,11 @@ def lookup_weather(city_name=None, zip_code=None):
     }
 
 
-tools = [
+# Construido una sola vez al cargar el módulo y pasado por referencia en cada
+# petición; congelado como tupla para que no se reconstruya ni se mute entre
+# llamadas — un prefijo estable es lo que permite al proveedor cachear el
+# prefill entre la primera llamada y el follow-up.
+tools = (
     {
         "type": "function",
         "function": {
@@ -64,8 +45,8 @@ tools = [
                 "additionalProperties": False,
             },
         },
-    }
-]
+    },
+)
 
 messages = [
     {"role": "system", "content": "Eres un chatbot de clima."},
@@ -85,11 +66,30 @@ print(f"Respuesta de {MODEL_NAME} en {API_HOST}: \n")
 if response.choices[0].message.tool_calls:
     tool_call = response.choices[0].message.tool_calls[0]
     function_name = tool_call.function.name
-    arguments = json.loads(tool_call.function.arguments)
+    arguments = orjson.loads(tool_call.function.arguments)
 
     if function_name == "lookup_weather":
-        messages.append(response.choices[0].message)
+        # Dict mínimo construido por acceso a atributos: anexar el objeto
+        # pydantic pondría toda su maquinaria de serialización en el camino
+        # de cada llamada de seguimiento.
+        messages.append(
+            {
+                "role": "assistant",
+                "content": response.choices[0].message.content or "",
+                "tool_calls": [
+                    {
+                        "id": tool_call.id,
+                        "type": "function",
+                        "function": {"name": function_name, "arguments": tool_call.function.arguments},
+                    }
+                ],
+            }
+        )
         result = lookup_weather(**arguments)
-        messages.append({"role": "tool", "tool_call_id": tool_call.id, "content": str(result)})
-        response = client.chat.completions.create(model=MODEL_NAME, messages=messages, tools=tools)
-        print(response.choices[0].message.content)
+        messages.append({"role": "tool", "tool_call_id": tool_call.id, "content": orjson.dumps(result).decode()})
+        # Respuesta final en streaming: los tokens se imprimen conforme llegan.
+        stream = client.chat.completions.create(model=MODEL_NAME, messages=messages, tools=tools, stream=True)
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                print(chunk.choices[0].delta.content, end="", flush=True)
+        print()
@@ -1,39 +1,21 @@
-import json
-import os
 from concurrent.futures import ThreadPoolExecutor
 
-import azure.identity
-import openai
-from dotenv import load_dotenv
+import orjson
 
-# Configura el cliente de OpenAI para usar la API de Azure, OpenAI.com u Ollama
-load_dotenv(override=True)
-API_HOST = os.getenv("API_HOST", "github")
+from openai_client import get_api_host, get_client
 
-if API_HOST == "azure":
-    token_provider = azure.identity.get_bearer_token_provider(
-        azure.identity.DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
-    )
-    client = openai.OpenAI(
-        base_url=os.environ["AZURE_OPENAI_ENDPOINT"],
-        api_key=token_provider,
-    )
-    MODEL_NAME = os.environ["AZURE_OPENAI_CHAT_DEPLOYMENT"]
-
-elif API_HOST == "ollama":
-    client = openai.OpenAI(base_url=os.environ["OLLAMA_ENDPOINT"], api_key="nokeyneeded")
-    MODEL_NAME = os.environ["OLLAMA_MODEL"]
-
-elif API_HOST == "github":
-    client = openai.OpenAI(base_url="https://models.github.ai/inference", api_key=os.environ["GITHUB_TOKEN"])
-    MODEL_NAME = os.getenv("GITHUB_MODEL", "openai/gpt-4o")
-
-else:
-    client = openai.OpenAI(api_key=os.environ["OPENAI_KEY"])
-    MODEL_NAME = os.environ["OPENAI_MODEL"]
+# La construcción del cliente (incluido el parseo de .env y el descubrimiento
+# de credenciales de Azure) ocurre una sola vez en el módulo compartido, no
+# por script.
+client, MODEL_NAME = get_client()
+API_HOST = get_api_host()
 
 
-tools = [
+# Construido una sola vez al cargar el módulo y pasado por referencia en cada
+# petición; congelado como tupla para que no se reconstruya ni se mute entre
+# llamadas — un prefijo estable es lo que permite al proveedor cachear el
+# prefill entre la primera llamada y el follow-up.
+tools = (
     {
         "type": "function",
         "function": {
@@ -76,7 +58,7 @@ tools = [
             },
         },
     },
-]
+)
 
 
 # ---------------------------------------------------------------------------
@@ -135,25 +117,47 @@ if response.choices[0].message.tool_calls:
     tool_calls = response.choices[0].message.tool_calls
     print(f"El modelo solicitó {len(tool_calls)} llamada(s) de herramienta:\n")
 
-    # Add the assistant's message (with tool calls) to the conversation
-    messages.append(response.choices[0].message)
+    # Anexa el mensaje del asistente como dict mínimo construido por acceso a
+    # atributos; anexar el objeto pydantic pondría su serialización completa en
+    # el camino de la llamada de seguimiento.
+    messages.append(
+        {
+            "role": "assistant",
+            "content": response.choices[0].message.content or "",
+            "tool_calls": [
+                {
+                    "id": tc.id,
+                    "type": "function",
+                    "function": {"name": tc.function.name, "arguments": tc.function.arguments},
+                }
+                for tc in tool_calls
+            ],
+        }
+    )
 
     with ThreadPoolExecutor() as executor:
-        # Submit all tool calls to the thread pool
-        futures = []
+        # Manda todas las tool calls al pool de threads. A veces el modelo
+        # repite la misma llamada con argumentos idénticos en un mismo turno;
+        # un memo por (nombre, argumentos canónicos) colapsa los duplicados en
+        # una sola ejecución compartida.
+        futures_by_key = {}
+        requested_calls = []
         for tool_call in tool_calls:
             function_name = tool_call.function.name
-            arguments = json.loads(tool_call.function.arguments)
+            arguments = orjson.loads(tool_call.function.arguments)
             print(f"Solicitud de herramienta: {function_name}({arguments})")
 
             if function_name in available_functions:
-                future = executor.submit(available_functions[function_name], **arguments)
-                futures.append((tool_call, function_name, future))
-
-        # Add each tool result to the conversation
-        for tool_call, function_name, future in futures:
-            result = future.result()
-            messages.append({"role": "tool", "tool_call_id": tool_call.id, "content": json.dumps(result)})
+                key = (function_name, orjson.dumps(arguments, option=orjson.OPT_SORT_KEYS))
+                if key not in futures_by_key:
+                    futures_by_key[key] = executor.submit(available_functions[function_name], **arguments)
+                requested_calls.append((tool_call, key))
+
+        # Agrega cada resultado a la conversación; cada tool_call_id duplicado
+        # recibe el mismo resultado compartido.
+        for tool_call, key in requested_calls:
+            result = futures_by_key[key].result()
+            messages.append({"role": "tool", "tool_call_id": tool_call.id, "content": orjson.dumps(result).decode()})
 
     # Get final response from the model with all tool results
     final_response = client.chat.completions.create(model=MODEL_NAME, messages=messages, tools=tools)
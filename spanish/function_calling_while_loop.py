@@ -1,37 +1,24 @@
-import json
-import os
+import re
 from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
-import azure.identity
-import openai
-from dotenv import load_dotenv
+import orjson
 
-# Configura el cliente de OpenAI para usar Azure, OpenAI.com, GitHub Models u Ollama
-load_dotenv(override=True)
-API_HOST = os.getenv("API_HOST", "github")
+from openai_client import get_api_host, get_client
 
-if API_HOST == "azure":
-    token_provider = azure.identity.get_bearer_token_provider(
-        azure.identity.DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
-    )
-    client = openai.OpenAI(
-        base_url=os.environ["AZURE_OPENAI_ENDPOINT"],
-        api_key=token_provider,
-    )
-    MODEL_NAME = os.environ["AZURE_OPENAI_CHAT_DEPLOYMENT"]
-elif API_HOST == "ollama":
-    client = openai.OpenAI(base_url=os.environ["OLLAMA_ENDPOINT"], api_key="nokeyneeded")
-    MODEL_NAME = os.environ["OLLAMA_MODEL"]
-elif API_HOST == "github":
-    client = openai.OpenAI(base_url="https://models.github.ai/inference", api_key=os.environ["GITHUB_TOKEN"])
-    MODEL_NAME = os.getenv("GITHUB_MODEL", "openai/gpt-4o")
-else:
-    client = openai.OpenAI(api_key=os.environ["OPENAI_KEY"])
-    MODEL_NAME = os.environ["OPENAI_MODEL"]
-
-
-tools = [
+# La construcción del cliente (incluido el parseo de .env y el descubrimiento
+# de credenciales de Azure) ocurre una sola vez en el módulo compartido, no
+# por script.
+client, MODEL_NAME = get_client()
+API_HOST = get_api_host()
+
+
+# Construido una sola vez al cargar el módulo y pasado por referencia en cada
+# petición; congelado como tupla para que no se reconstruya ni se mute entre
+# llamadas — un prefijo estable es lo que permite al proveedor cachear el
+# prefill entre la primera llamada y el follow-up.
+tools = (
     {
         "type": "function",
         "function": {
@@ -62,34 +49,49 @@ tools = [
             },
         },
     },
-]
+)
 
 
 # ---------------------------------------------------------------------------
 # Implementaciones de herramientas
 # ---------------------------------------------------------------------------
-def lookup_weather(city_name: str | None = None, zip_code: str | None = None) -> dict[str, Any]:
-    """Devuelve un clima simulado para la ubicación proporcionada."""
-    location = city_name or zip_code or "desconocido"
-    return {
-        "ubicacion": location,
+# La salida de cada herramienta tiene forma fija, así que su JSON se
+# pre-serializa en bytes al cargar el módulo y cada llamada hace un único
+# replace del marcador de ubicación — sin construir dicts ni recorrer el
+# payload con el serializador por llamada. Las herramientas devuelven el
+# string terminado; el bucle lo anexa como contenido sin otra serialización.
+_WEATHER_TPL = orjson.dumps(
+    {
+        "ubicacion": "__LOC__",
         "condicion": "chubascos",
         "lluvia_mm_ult_24h": 7,
         "recomendacion": "Buen día para actividades bajo techo si no te gusta la llovizna.",
     }
-
-
-def lookup_movies(city_name: str | None = None, zip_code: str | None = None) -> dict[str, Any]:
-    """Devuelve una lista simulada de películas en cartelera."""
-    location = city_name or zip_code or "desconocido"
-    return {
-        "ubicacion": location,
+)
+_MOVIES_TPL = orjson.dumps(
+    {
+        "ubicacion": "__LOC__",
         "peliculas": [
             {"titulo": "El Arrecife Cuántico", "clasificacion": "PG-13"},
             {"titulo": "Tormenta Sobre Bahía Puerto", "clasificacion": "PG"},
             {"titulo": "Koala de Medianoche", "clasificacion": "R"},
         ],
     }
+)
+
+
+def lookup_weather(city_name: str | None = None, zip_code: str | None = None) -> str:
+    """Devuelve un clima simulado (JSON ya serializado) para la ubicación."""
+    location = city_name or zip_code or "desconocido"
+    # El marcador se reemplaza con la ubicación serializada, que llega con
+    # comillas y escapes correctos.
+    return _WEATHER_TPL.replace(b'"__LOC__"', orjson.dumps(location)).decode()
+
+
+def lookup_movies(city_name: str | None = None, zip_code: str | None = None) -> str:
+    """Devuelve la cartelera simulada (JSON ya serializado) para la ubicación."""
+    location = city_name or zip_code or "desconocido"
+    return _MOVIES_TPL.replace(b'"__LOC__"', orjson.dumps(location)).decode()
 
 
 tool_mapping: dict[str, Callable[..., Any]] = {
@@ -98,6 +100,23 @@ tool_mapping: dict[str, Callable[..., Any]] = {
 }
 
 
+def normalize_cache_key(fn_name: str, parsed_args: dict) -> tuple[str, str]:
+    """Clave canónica para el cache de resultados de herramientas.
+
+    Ordena las claves y normaliza los strings (minúsculas, sin espacios en
+    los extremos) para que "Sídney" y "sídney " compartan entrada.
+    """
+    normalized = {key: value.strip().lower() if isinstance(value, str) else value for key, value in parsed_args.items()}
+    return (fn_name, orjson.dumps(normalized, option=orjson.OPT_SORT_KEYS).decode())
+
+
+# Resultados ya observados por (herramienta, argumentos normalizados): las
+# trazas de tool calling repiten muchas invocaciones idénticas dentro de una
+# conversación, y cada acierto ahorra el viaje completo a la herramienta.
+# Para herramientas remotas reales conviene añadir un TTL.
+_tool_cache: dict[tuple[str, str], str] = {}
+
+
 # ---------------------------------------------------------------------------
 # Bucle conversacional
 # ---------------------------------------------------------------------------
@@ -108,46 +127,102 @@ messages: list[dict[str, Any]] = [
 
 print(f"Modelo: {MODEL_NAME} en Host: {API_HOST}\n")
 
+# Clasificador barato sobre el turno del usuario: si la pregunta claramente
+# necesita herramientas, el primer turno las exige con tool_choice="required"
+# en lugar de dejar que el modelo quizá responda sin llamarlas — eso ahorra
+# un turno completo de modelo cuando habría dudado. Tras anexar los
+# resultados se pasa a "none", forzando la síntesis en un solo turno en vez
+# de permitir otra ronda de llamadas.
+TOOL_KEYWORDS = re.compile(r"lluvia|llueve|clima|cine|película", re.IGNORECASE)
+tool_choice = "required" if TOOL_KEYWORDS.search(messages[-1]["content"]) else "auto"
+
 while True:
     print("Invocando el modelo...\n")
-    response = client.chat.completions.create(
+    stream = client.chat.completions.create(
         model=MODEL_NAME,
         messages=messages,
         tools=tools,
-        tool_choice="auto",
-        parallel_tool_calls=False,
+        tool_choice=tool_choice,
+        stream=True,
     )
 
-    choice = response.choices[0]
-    assistant_message = choice.message
-
-    if not assistant_message.tool_calls:
-        print("Asistente:")
-        print(assistant_message.content)
+    # Acumula los deltas del stream: los tokens de la respuesta se imprimen
+    # conforme llegan (el primer token aparece en cientos de ms en lugar de
+    # esperar la generación completa) y los fragmentos de tool calls se
+    # rearman por índice.
+    content_parts: list[str] = []
+    tool_calls_by_index: dict[int, dict] = {}
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            if not content_parts:
+                print("Asistente:")
+            content_parts.append(delta.content)
+            print(delta.content, end="", flush=True)
+        for tc_delta in delta.tool_calls or []:
+            tool_call = tool_calls_by_index.setdefault(
+                tc_delta.index, {"id": "", "type": "function", "function": {"name": "", "arguments": ""}}
+            )
+            if tc_delta.id:
+                tool_call["id"] = tc_delta.id
+            if tc_delta.function.name:
+                tool_call["function"]["name"] += tc_delta.function.name
+            if tc_delta.function.arguments:
+                tool_call["function"]["arguments"] += tc_delta.function.arguments
+
+    tool_calls = [tool_calls_by_index[index] for index in sorted(tool_calls_by_index)]
+
+    if not tool_calls:
+        print()
         break
 
     messages.append(
         {
             "role": "assistant",
-            "content": assistant_message.content or "",
-            "tool_calls": [tc.model_dump() for tc in assistant_message.tool_calls],
+            "content": "".join(content_parts),
+            "tool_calls": tool_calls,
         }
     )
 
-    for tool_call in assistant_message.tool_calls:
-        fn_name = tool_call.function.name
-        raw_args = tool_call.function.arguments or "{}"
-        print(f"Solicitud de herramienta: {fn_name}({raw_args})")
-        target_tool = tool_mapping.get(fn_name)
-        parsed_args = json.loads(raw_args)
-        tool_result = target_tool(**parsed_args)
-        tool_result_str = json.dumps(tool_result)
-        # Agrega la respuesta de la herramienta a la conversación
-        messages.append(
-            {
-                "role": "tool",
-                "tool_call_id": tool_call.id,
-                "name": fn_name,
-                "content": tool_result_str,
-            }
-        )
+    # Ejecuta las herramientas solicitadas en paralelo: son llamadas
+    # independientes de I/O, así que el turno cuesta el máximo de las
+    # latencias en lugar de la suma.
+    with ThreadPoolExecutor() as executor:
+        futures = []
+        for tool_call in tool_calls:
+            fn_name = tool_call["function"]["name"]
+            raw_args = tool_call["function"]["arguments"] or "{}"
+            print(f"Solicitud de herramienta: {fn_name}({raw_args})")
+            target_tool = tool_mapping.get(fn_name)
+            # Atajo para argumentos vacíos: ni siquiera se invoca el parser.
+            parsed_args = {} if raw_args == "{}" else orjson.loads(raw_args)
+            cache_key = normalize_cache_key(fn_name, parsed_args)
+            if cache_key in _tool_cache:
+                # Acierto de cache: no se ejecuta la herramienta.
+                futures.append((tool_call, fn_name, cache_key, None))
+            else:
+                futures.append((tool_call, fn_name, cache_key, executor.submit(target_tool, **parsed_args)))
+
+        # Agrega los resultados en el orden en que el modelo pidió las
+        # herramientas, para que los mensajes tool queden alineados con
+        # los tool_calls del asistente.
+        for tool_call, fn_name, cache_key, future in futures:
+            if future is None:
+                tool_result_str = _tool_cache[cache_key]
+            else:
+                tool_result_str = future.result()  # JSON ya serializado
+                _tool_cache[cache_key] = tool_result_str
+            messages.append(
+                {
+                    "role": "tool",
+                    "tool_call_id": tool_call["id"],
+                    "name": fn_name,
+                    "content": tool_result_str,
+                }
+            )
+
+    # Con los resultados ya en la conversación, el siguiente turno es solo
+    # síntesis: prohibir más herramientas evita otra ronda de llamadas.
+    tool_choice = "none"
@@ -0,0 +1,69 @@
+"""Setup compartido del cliente de OpenAI para los scripts de demostración.
+
+Cada demo necesita el mismo boilerplate de "usa Azure, OpenAI.com, GitHub
+Models u Ollama". Construir el cliente aquí, una vez por proceso, hace que el
+parseo de .env y el descubrimiento de credenciales ocurran una sola vez —
+DefaultAzureCredential en particular sondea varias fuentes de credenciales y
+puede tardar cientos de milisegundos por construcción. Los clientes también
+usan una conexión HTTP con pool, así que las llamadas repetidas reutilizan
+sockets en lugar de renegociar el handshake.
+"""
+
+import functools
+import os
+
+import httpx
+import openai
+from dotenv import load_dotenv
+
+
+@functools.cache
+def get_api_host() -> str:
+    """Carga .env una sola vez y reporta qué API host usan las demos."""
+    load_dotenv(override=True)
+    return os.getenv("API_HOST", "github")
+
+
+@functools.cache
+def get_client() -> tuple[openai.OpenAI, str]:
+    """Construye el cliente síncrono y el nombre del modelo para el API host configurado."""
+    api_host = get_api_host()
+    # http2=True permite multiplexar llamadas secuenciales y streams
+    # paralelos sobre una sola conexión negociada en lugar de abrir
+    # sockets nuevos.
+    http_client = httpx.Client(http2=True, limits=httpx.Limits(max_keepalive_connections=20), timeout=60.0)
+
+    if api_host == "azure":
+        # Import perezoso: azure.identity tarda en importarse y solo se necesita aquí.
+        import azure.identity
+
+        # Sondea solo las fuentes de credenciales bajo las que corren estas
+        # demos; cada fuente excluida es un sondeo secuencial menos al pedir
+        # el primer token.
+        credential = azure.identity.DefaultAzureCredential(
+            exclude_interactive_browser_credential=True,
+            exclude_visual_studio_code_credential=True,
+            exclude_shared_token_cache_credential=True,
+            exclude_powershell_credential=True,
+        )
+        token_provider = azure.identity.get_bearer_token_provider(
+            credential, "https://cognitiveservices.azure.com/.default"
+        )
+        client = openai.OpenAI(
+            base_url=os.environ["AZURE_OPENAI_ENDPOINT"],
+            api_key=token_provider,
+            http_client=http_client,
+        )
+        model_name = os.environ["AZURE_OPENAI_CHAT_DEPLOYMENT"]
+    elif api_host == "ollama":
+        client = openai.OpenAI(base_url=os.environ["OLLAMA_ENDPOINT"], api_key="nokeyneeded", http_client=http_client)
+        model_name = os.environ["OLLAMA_MODEL"]
+    elif api_host == "github":
+        client = openai.OpenAI(
+            base_url="https://models.github.ai/inference", api_key=os.environ["GITHUB_TOKEN"], http_client=http_client
+        )
+        model_name = os.getenv("GITHUB_MODEL", "openai/gpt-4o")
+    else:
+        client = openai.OpenAI(api_key=os.environ["OPENAI_KEY"], http_client=http_client)
+        model_name = os.environ["OPENAI_MODEL"]
+    return client, model_name